@@ -0,0 +1,81 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# ── Admission Control ──
+# Counts model calls in flight and keeps their recent latencies. When either
+# crosses its threshold, new calls are shed to voicemail at /voice instead of
+# joining the queue for the model; calls already in progress are never shed,
+# so they keep the capacity they started with. Latency samples expire after
+# window_seconds so the service recovers once the spike has passed.
+
+
+class AdmissionController:
+    def __init__(self, max_in_flight=48, max_latency_seconds=5.0, latency_percentile=90, window_seconds=30,
+                 min_samples=10):
+        self.max_in_flight = max_in_flight
+        self.max_latency_seconds = max_latency_seconds
+        self.latency_percentile = latency_percentile
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self._samples = deque()  # (finished_at, seconds)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed = 0
+
+    @contextmanager
+    def track(self):
+        """Wrap one model call: counts it as in flight and records how long it took, failed or not."""
+        started = time.perf_counter()
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            finished = time.perf_counter()
+            with self._lock:
+                self.in_flight -= 1
+                self._samples.append((finished, finished - started))
+
+    def recent_latency(self):
+        """The configured percentile of model latency over the window, or None with too few samples."""
+        cutoff = time.perf_counter() - self.window_seconds
+        with self._lock:
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(seconds for _, seconds in self._samples)
+        return ordered[min(len(ordered) - 1, int(self.latency_percentile / 100 * len(ordered)))]
+
+    def overload_reason(self):
+        """Why a new call should be shed right now ('in_flight' or 'latency'), or None to admit it."""
+        if self.max_in_flight and self.in_flight >= self.max_in_flight:
+            return 'in_flight'
+        latency = self.recent_latency() if self.max_latency_seconds else None
+        if latency is not None and latency >= self.max_latency_seconds:
+            return 'latency'
+        return None
+
+    def admit(self):
+        """Returns (admitted, reason). Only ask for new calls — active ones always continue."""
+        reason = self.overload_reason()
+        with self._lock:
+            if reason:
+                self.shed += 1
+            else:
+                self.admitted += 1
+        return reason is None, reason
+
+    def stats(self):
+        latency = self.recent_latency()
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            f"p{self.latency_percentile:g}_seconds": round(latency, 3) if latency is not None else None,
+            "max_latency_seconds": self.max_latency_seconds,
+            "admitted": self.admitted,
+            "shed": self.shed
+        }
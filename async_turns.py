@@ -0,0 +1,58 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# ── Asynchronous Turns ──
+# Model calls run on a worker pool while Twilio plays a short hold and polls
+# /answer/<CallSid>, so webhook response time no longer depends on the model.
+
+
+class PendingTurn:
+    __slots__ = ('future', 'speech_result', 'caller_id', 'started', 'polls')
+
+    def __init__(self, future, speech_result, caller_id):
+        self.future = future
+        self.speech_result = speech_result
+        self.caller_id = caller_id
+        self.started = time.time()
+        self.polls = 0
+
+
+class TurnRunner:
+    def __init__(self, max_workers=16, stale_seconds=120):
+        self.stale_seconds = stale_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="llm-turn")
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def start(self, call_sid, speech_result, caller_id, fn, *args, **kwargs):
+        future = self._executor.submit(fn, *args, **kwargs)
+        with self._lock:
+            self._drop_stale()
+            self._pending[call_sid] = PendingTurn(future, speech_result, caller_id)
+        return future
+
+    def adopt(self, call_sid, future, speech_result, caller_id):
+        """Track a model call that was already started elsewhere (a speculative prefetch)."""
+        with self._lock:
+            self._drop_stale()
+            self._pending[call_sid] = PendingTurn(future, speech_result, caller_id)
+        return future
+
+    def get(self, call_sid):
+        with self._lock:
+            return self._pending.get(call_sid)
+
+    def pop(self, call_sid):
+        with self._lock:
+            return self._pending.pop(call_sid, None)
+
+    def in_flight(self):
+        with self._lock:
+            return sum(1 for turn in self._pending.values() if not turn.future.done())
+
+    def _drop_stale(self):
+        # Callers who hung up mid-turn never poll again
+        cutoff = time.time() - self.stale_seconds
+        for call_sid in [sid for sid, turn in self._pending.items() if turn.started < cutoff]:
+            del self._pending[call_sid]
@@ -0,0 +1,175 @@
+import threading
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+# ── Availability Engine ──
+# One freebusy request covers every agent calendar. Busy intervals are merged,
+# kept sorted per calendar and cached for a short TTL, so slot lookups are a
+# bisect over local data. Stale data is served while a background refresh
+# runs; only a cold cache waits on the network.
+
+
+class BusyIndex:
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self, intervals):
+        merged = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [s for s, _ in merged]
+        self.ends = [e for _, e in merged]
+
+    def is_free(self, start, end):
+        # First busy interval that ends after our start must begin at/after our end
+        i = bisect_right(self.ends, start)
+        return i == len(self.starts) or self.starts[i] >= end
+
+
+class AvailabilityEngine:
+    def __init__(self, get_service, calendar_ids, tz, hours_start=8, hours_end=17, business_days=(0, 1, 2, 3, 4),
+                 days_ahead=14, ttl_seconds=120, slot_minutes=60):
+        self.get_service = get_service
+        self.calendar_ids = sorted({c for c in calendar_ids if c})
+        self.tz = tz
+        self.hours_start = hours_start
+        self.hours_end = hours_end
+        self.business_days = set(business_days)
+        self.days_ahead = days_ahead
+        self.ttl_seconds = ttl_seconds
+        self.slot = timedelta(minutes=slot_minutes)
+        self._index = {}
+        self._fetched_at = 0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.hits = 0
+        self.refreshes = 0
+
+    # ── Cache ──
+
+    def refresh(self):
+        """Fetch busy intervals for every calendar with one freebusy query."""
+        if not self.calendar_ids:
+            return
+        now = datetime.now(self.tz)
+        body = {
+            'timeMin': now.isoformat(),
+            'timeMax': (now + timedelta(days=self.days_ahead)).isoformat(),
+            'timeZone': str(self.tz),
+            'items': [{'id': c} for c in self.calendar_ids]
+        }
+        result = self.get_service().freebusy().query(body=body).execute()
+        index = {}
+        for calendar_id in self.calendar_ids:
+            busy = result.get('calendars', {}).get(calendar_id, {}).get('busy', [])
+            index[calendar_id] = BusyIndex(
+                (datetime.fromisoformat(b['start'].replace('Z', '+00:00')).astimezone(self.tz),
+                 datetime.fromisoformat(b['end'].replace('Z', '+00:00')).astimezone(self.tz))
+                for b in busy)
+        with self._lock:
+            self._index = index
+            self._fetched_at = time.time()
+            self.refreshes += 1
+
+    def _background_refresh(self):
+        try:
+            self.refresh()
+        except Exception as e:
+            print(f"Availability refresh error: {e}")
+        finally:
+            self._refreshing = False
+
+    def busy_index(self, calendar_id):
+        with self._lock:
+            index = self._index.get(calendar_id)
+            stale = time.time() - self._fetched_at >= self.ttl_seconds
+            if index is not None and stale and not self._refreshing:
+                self._refreshing = True
+                threading.Thread(target=self._background_refresh, name="availability-refresh", daemon=True).start()
+        if index is None:
+            # Cold cache — this one request pays for the round trip
+            self.refresh()
+            with self._lock:
+                index = self._index.get(calendar_id, BusyIndex([]))
+        else:
+            self.hits += 1
+        return index
+
+    def invalidate(self):
+        with self._lock:
+            self._fetched_at = 0
+
+    def mark_busy(self, calendar_id, start, end):
+        """Record a booking locally so the next lookup sees it before the next refresh."""
+        with self._lock:
+            index = self._index.get(calendar_id)
+            if index is not None:
+                self._index[calendar_id] = BusyIndex(list(zip(index.starts, index.ends)) + [(start, end)])
+
+    # ── Slots ──
+
+    def in_business_hours(self, start):
+        end = start + self.slot
+        return (start.weekday() in self.business_days and start.hour >= self.hours_start
+                and (end.hour < self.hours_end or (end.hour == self.hours_end and end.minute == 0))
+                and end.date() == start.date())
+
+    def is_free(self, calendar_id, start):
+        return self.busy_index(calendar_id).is_free(start, start + self.slot)
+
+    def free_slots(self, calendar_ids, count=4, after=None, days_ahead=None, per_day=None):
+        """Next open hourly slots during business hours, free on any of calendar_ids. With per_day, at most that
+        many from any one day, so a handful of slots spans several days."""
+        indexes = [self.busy_index(c) for c in calendar_ids if c]
+        if not indexes:
+            return []
+        now = after or datetime.now(self.tz)
+        check = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        end_date = now + timedelta(days=min(days_ahead or self.days_ahead, self.days_ahead))
+        slots = []
+        while check < end_date and len(slots) < count:
+            day_full = per_day and sum(1 for s in slots if s.date() == check.date()) >= per_day
+            if day_full or not self.in_business_hours(check):
+                # Jump straight to the next opening hour instead of stepping hour by hour
+                next_day = check if check.hour < self.hours_start and not day_full else check + timedelta(days=1)
+                check = self.tz.localize(datetime(next_day.year, next_day.month, next_day.day, self.hours_start))
+                while check.weekday() not in self.business_days:
+                    check = self.tz.normalize(check + timedelta(days=1))
+                continue
+            if any(index.is_free(check, check + self.slot) for index in indexes):
+                slots.append(check)
+            check = self.tz.normalize(check + timedelta(hours=1))
+        return slots
+
+    def nearest_free(self, calendar_id, requested, search_days=7):
+        """The free business-hours slot closest to `requested` (before or after), or None."""
+        index = self.busy_index(calendar_id)
+        now = datetime.now(self.tz)
+        best = None
+        for step in range(0, search_days * 24 + 1):
+            for candidate in (requested + timedelta(hours=step), requested - timedelta(hours=step)):
+                candidate = self.tz.normalize(candidate)
+                if candidate <= now or not self.in_business_hours(candidate):
+                    continue
+                if index.is_free(candidate, candidate + self.slot):
+                    best = candidate
+                    break
+            if best:
+                return best
+        return None
+
+    @staticmethod
+    def speakable(slot):
+        return slot.strftime('%A at %I:%M %p').replace(':00', '').replace(' 0', ' ')
+
+    def stats(self):
+        with self._lock:
+            return {
+                "calendars": len(self.calendar_ids),
+                "cache_age_seconds": round(time.time() - self._fetched_at, 1) if self._fetched_at else None,
+                "hits": self.hits,
+                "refreshes": self.refreshes
+            }
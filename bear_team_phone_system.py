@@ -1,19 +1,36 @@
-from flask import Flask, request
+from flask import Flask, request, g, Response, stream_with_context
 from twilio.twiml.voice_response import VoiceResponse, Gather
-from twilio.rest import Client
-import anthropic
 import os
 from datetime import datetime, timedelta
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from dotenv import load_dotenv
-import gspread
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
-import json
 import pytz
 import re
+import time
+import json
+import threading
+import hmac
+import copy
+import functools
+from job_queue import JobQueue
+from google_clients import GoogleClients
+from sheet_writer import BufferedSheetWriter
+from mailer import Mailer
+from conversation_store import create_store
+from async_turns import TurnRunner
+from prefetch import SpeculativePrefetcher
+from idempotency import WebhookDeduplicator
+from response_cache import ResponseCache
+from classifier import CallClassifier
+from time_parser import parse_time
+from availability import AvailabilityEngine
+from booking import BookingLedger, Booker, SlotTaken
+from call_history import CallHistory
+from call_log import CallLog
+from metrics import Registry
+from model_guard import ModelGuard, CircuitOpenError
+from admission import AdmissionController
+from script_flow import ScriptFlow, PHONE_PATTERN, INTENT_PHRASES, extract_caller_name
+from tenants import Tenant, TenantRegistry, TenantServices
 
 load_dotenv()
 
@@ -73,15 +90,131 @@ GOOGLE_SHEET_ID = os.environ.get('GOOGLE_SHEET_ID')
 GOOGLE_CREDENTIALS_FILE = os.environ.get('GOOGLE_CREDENTIALS_FILE', 'credentials.json')
 GOOGLE_CREDENTIALS_JSON = os.environ.get('GOOGLE_CREDENTIALS_JSON')
 GOOGLE_CALENDAR_ID = os.environ.get('GOOGLE_CALENDAR_ID')
+AGENT_CALENDAR_IDS = json.loads(os.environ.get('AGENT_CALENDAR_IDS', '{}'))  # {"sellers": "...", "buyers1": "..."}
+AVAILABILITY_TTL_SECONDS = int(os.environ.get('AVAILABILITY_TTL_SECONDS', 120))
+BOOKING_DB = os.environ.get('BOOKING_DB', 'bookings.db')
+BOOKING_BATCH_SIZE = int(os.environ.get('BOOKING_BATCH_SIZE', 10))  # Bookings per Calendar batch when catching up
+JOB_QUEUE_DB = os.environ.get('JOB_QUEUE_DB', 'jobs.db')
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 3))
+SHEETS_BATCH_SIZE = int(os.environ.get('SHEETS_BATCH_SIZE', 20))
+SHEETS_FLUSH_SECONDS = float(os.environ.get('SHEETS_FLUSH_SECONDS', 10))
+SHEETS_SPOOL_FILE = os.environ.get('SHEETS_SPOOL_FILE', 'sheets_spool.jsonl')
+SMTP_HOST = os.environ.get('SMTP_HOST', 'smtp.gmail.com')
+SMTP_PORT = int(os.environ.get('SMTP_PORT', 587))
+SMTP_STARTTLS = os.environ.get('SMTP_STARTTLS', 'true').lower() != 'false'
+SMTP_IDLE_SECONDS = int(os.environ.get('SMTP_IDLE_SECONDS', 240))
+EMAIL_DIGEST_MINUTES = int(os.environ.get('EMAIL_DIGEST_MINUTES', 0))  # 0 = send every email right away
+EMAIL_DIGEST_MAX_ITEMS = int(os.environ.get('EMAIL_DIGEST_MAX_ITEMS', 200))  # Most notifications in one digest email
+CONVERSATION_STORE = os.environ.get('CONVERSATION_STORE', 'memory')  # 'memory' or 'sqlite'
+CONVERSATION_DB = os.environ.get('CONVERSATION_DB', 'conversations.db')
+CONVERSATION_TTL_MINUTES = int(os.environ.get('CONVERSATION_TTL_MINUTES', 30))
+CONVERSATION_MAX_ENTRIES = int(os.environ.get('CONVERSATION_MAX_ENTRIES', 5000))
+CALL_HISTORY_DB = os.environ.get('CALL_HISTORY_DB', 'call_history.db')
+RETURNING_CALLER_DAYS = int(os.environ.get('RETURNING_CALLER_DAYS', 90))  # How far back a call counts as "returning"
+CALL_LOG_DB = os.environ.get('CALL_LOG_DB', 'call_log.db')
+EXPORT_TOKEN = os.environ.get('EXPORT_TOKEN')  # Bearer token for /export and /report; unset disables both
+ANTHROPIC_MODEL = os.environ.get('ANTHROPIC_MODEL', 'claude-sonnet-4-5-20250929')
+HISTORY_TOKEN_BUDGET = int(os.environ.get('HISTORY_TOKEN_BUDGET', 400))
+ASYNC_TURNS = os.environ.get('ASYNC_TURNS', 'false').lower() == 'true'
+ASYNC_TURN_WORKERS = int(os.environ.get('ASYNC_TURN_WORKERS', 16))
+ANSWER_POLL_SECONDS = int(os.environ.get('ANSWER_POLL_SECONDS', 1))
+ANSWER_MAX_POLLS = int(os.environ.get('ANSWER_MAX_POLLS', 12))
+HOLD_FILLER = os.environ.get('HOLD_FILLER', 'One moment.')
+WEBHOOK_DEDUPE_SIZE = int(os.environ.get('WEBHOOK_DEDUPE_SIZE', 10000))
+WEBHOOK_DEDUPE_TTL_SECONDS = int(os.environ.get('WEBHOOK_DEDUPE_TTL_SECONDS', 300))
+WEBHOOK_DEDUPE_WAIT_SECONDS = float(os.environ.get('WEBHOOK_DEDUPE_WAIT_SECONDS', 20))  # Retry waits this long on the first
+PREFETCH = os.environ.get('PREFETCH', 'true').lower() != 'false'  # Start the model on stable partial transcripts
+PREFETCH_MIN_WORDS = int(os.environ.get('PREFETCH_MIN_WORDS', 3))
+PREFETCH_MIN_STABILITY = float(os.environ.get('PREFETCH_MIN_STABILITY', 0.8))
+PREFETCH_MATCH_RATIO = float(os.environ.get('PREFETCH_MATCH_RATIO', 0.9))  # How close the final text must be to reuse it
+WARMUP_MIN_INTERVAL_SECONDS = int(os.environ.get('WARMUP_MIN_INTERVAL_SECONDS', 60))  # /warmup more often returns the last report
+LLM_TURN_BUDGET_SECONDS = float(os.environ.get('LLM_TURN_BUDGET_SECONDS', 6))  # Longest a caller waits on the model
+LLM_TIMEOUT_SECONDS = float(os.environ.get('LLM_TIMEOUT_SECONDS', 10))  # Hard client timeout per request
+LLM_MAX_RETRIES = int(os.environ.get('LLM_MAX_RETRIES', 0))
+LLM_HEDGE = os.environ.get('LLM_HEDGE', 'false').lower() == 'true'
+LLM_HEDGE_PERCENTILE = float(os.environ.get('LLM_HEDGE_PERCENTILE', 95))
+LLM_BREAKER_FAILURES = int(os.environ.get('LLM_BREAKER_FAILURES', 5))
+LLM_BREAKER_RESET_SECONDS = int(os.environ.get('LLM_BREAKER_RESET_SECONDS', 30))
+ADMISSION_MAX_MODEL_CALLS = int(os.environ.get('ADMISSION_MAX_MODEL_CALLS', 48))  # 0 = no limit
+ADMISSION_MAX_LATENCY_SECONDS = float(os.environ.get('ADMISSION_MAX_LATENCY_SECONDS', 5))  # 0 = ignore latency
+ADMISSION_LATENCY_PERCENTILE = float(os.environ.get('ADMISSION_LATENCY_PERCENTILE', 90))
+ADMISSION_WINDOW_SECONDS = int(os.environ.get('ADMISSION_WINDOW_SECONDS', 30))
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 500))
+RESPONSE_CACHE_TTL_MINUTES = int(os.environ.get('RESPONSE_CACHE_TTL_MINUTES', 60))
+RESPONSE_CACHE_MAX_TURN = int(os.environ.get('RESPONSE_CACHE_MAX_TURN', 1))  # Only cache the first N caller turns
+BOOKING_MIN_CONFIDENCE = float(os.environ.get('BOOKING_MIN_CONFIDENCE', 0.7))  # Below this, email the request instead of booking
+TENANTS_DIR = os.environ.get('TENANTS_DIR')  # One JSON file per extra brokerage, picked by the number called
+TENANT_RELOAD_SECONDS = float(os.environ.get('TENANT_RELOAD_SECONDS', 5))
 
 EASTERN = pytz.timezone(TIMEZONE)
 
+# Each agent books on their own calendar; the shared calendar is the fallback
+for _key, _agent in AGENTS.items():
+    _agent['calendar_id'] = AGENT_CALENDAR_IDS.get(_key, GOOGLE_CALENDAR_ID)
+
+INTENT_AGENT_KEYS = {'seller': ['sellers'], 'renter': ['rentals'], 'buyer': ['buyers1', 'buyers2']}
+
 app = Flask(__name__)
 app.secret_key = os.environ.get('FLASK_SECRET_KEY', 'bear-team-secret')
 
-twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN) if TWILIO_ACCOUNT_SID else None
-anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
-conversations = {}
+# The Anthropic and Twilio REST libraries are slow to import — load them on
+# first use, or from warm_up() once the server is listening
+twilio_client = None
+anthropic_client = None
+_client_lock = threading.Lock()
+
+def get_anthropic_client():
+    global anthropic_client
+    if anthropic_client is None and ANTHROPIC_API_KEY:
+        with _client_lock:
+            if anthropic_client is None:
+                import anthropic
+                anthropic_client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY, timeout=LLM_TIMEOUT_SECONDS,
+                                                       max_retries=LLM_MAX_RETRIES)
+    return anthropic_client
+
+def get_twilio_client():
+    global twilio_client
+    if twilio_client is None and TWILIO_ACCOUNT_SID:
+        with _client_lock:
+            if twilio_client is None:
+                from twilio.rest import Client
+                twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
+    return twilio_client
+
+call_classifier = CallClassifier()
+conversations = create_store(CONVERSATION_STORE, CONVERSATION_DB, max_entries=CONVERSATION_MAX_ENTRIES,
+                             ttl_seconds=CONVERSATION_TTL_MINUTES * 60)
+call_history = CallHistory(CALL_HISTORY_DB, lookback_days=RETURNING_CALLER_DAYS)
+call_log = CallLog(CALL_LOG_DB)
+
+# ── Metrics ──
+
+metrics = Registry()
+stage_seconds = metrics.histogram('bear_stage_seconds', 'Time spent in each call-handling stage', labels=('stage',))
+request_seconds = metrics.histogram('bear_request_seconds', 'Webhook latency by route', labels=('route',))
+llm_ttft_seconds = metrics.histogram('bear_llm_ttft_seconds', 'Time to the first streamed model token')
+calls_total = metrics.counter('bear_calls_total', 'Incoming calls')
+turns_total = metrics.counter('bear_turns_total', 'Caller turns by what answered them', labels=('source',))
+prefetch_total = metrics.counter('bear_prefetch_total', 'Speculative model calls from partial speech by outcome',
+                                 labels=('result',))
+webhook_duplicates_total = metrics.counter('bear_webhook_duplicates_total',
+                                           'Retried webhooks answered from the first response', labels=('route',))
+call_turns = metrics.histogram('bear_call_turns', 'Caller turns per finished call', buckets=(1, 2, 3, 4, 5, 6, 8, 10, 15))
+calls_shed_total = metrics.counter('bear_calls_shed_total', 'New calls sent straight to voicemail under overload',
+                                   labels=('reason',))
+escalations_total = metrics.counter('bear_escalations_total', 'Calls wrapped up because they ran too long')
+swallowed_total = metrics.counter('bear_swallowed_exceptions_total', 'Exceptions logged instead of raised',
+                                  labels=('where',))
+metrics.gauge('bear_active_conversations', 'Conversations held in the store', lambda: len(conversations))
+metrics.gauge('bear_turns_in_flight', 'Model turns running in the background', lambda: turn_runner.in_flight())
+metrics.gauge('bear_model_calls_in_flight', 'Model requests waiting on the API', lambda: admission.in_flight)
+metrics.gauge('bear_job_queue_depth', 'Background jobs pending or running', lambda: job_queue.depth())
+metrics.gauge('bear_model_circuit_open', '1 while model calls are skipped after repeated failures',
+              lambda: int(not model_guard.available()))
+metrics.gauge('bear_sheets_pending_rows', 'Rows waiting for the next Sheets flush',
+              lambda: sum(s.sheet_writer.pending() for s in tenant_services()))
+metrics.gauge('bear_tenants', 'Brokerages served by this process', lambda: len(tenants.all()))
 
 BUSINESS_KNOWLEDGE = """
 BEAR TEAM REAL ESTATE — ORLANDO, FLORIDA
@@ -172,25 +305,47 @@ Offer a free comparative market analysis with Bethanne.
 """
 
 class ConversationManager:
-    def __init__(self, caller_id):
+    __slots__ = ('caller_id', 'attempt_count', 'conversation_history', 'caller_questions', 'caller_intent',
+                 'caller_name', 'callback_number', 'said_goodbye', 'previous_call', 'tenant_key', 'offered_slot',
+                 'agreed_slot', 'agent_key', 'agent_intent', 'openings')
+
+    def __init__(self, caller_id, tenant_key=None):
         self.caller_id = caller_id
+        self.tenant_key = tenant_key  # Which brokerage was called; None is the default one
         self.attempt_count = 0
         self.conversation_history = []
         self.caller_questions = []
         self.caller_intent = None  # 'buyer', 'seller', 'renter', 'general'
+        self.caller_name = None
+        self.callback_number = None  # Set once the caller confirms or gives a number
+        self.said_goodbye = False
+        self.previous_call = None  # Last call from this number, if they've called before
+        self.offered_slot = None  # An opening we proposed because the requested time was taken
+        self.agreed_slot = None  # The slot the caller accepted — the only one that gets booked
+        self.agent_key = None  # The agent this call goes to, decided once so every turn and the booking agree
+        self.agent_intent = None  # The intent agent_key was picked for
+        self.openings = []  # Open slots last offered to the caller
+
+    @property
+    def tenant(self):
+        return tenants.get(self.tenant_key)
+
+    def remember(self, previous_call):
+        """Pre-fill what we learned last time so the script skips the intent and name steps."""
+        self.previous_call = previous_call
+        self.caller_intent = previous_call['intent']
+        self.caller_name = previous_call['caller_name']
+        self.callback_number = previous_call['callback_number']
 
     def add_question(self, question):
         self.attempt_count += 1
         self.caller_questions.append(question)
         self.conversation_history.append({"role": "user", "content": question})
-        # Detect intent
-        q = question.lower()
-        if any(w in q for w in ['buy', 'buying', 'purchase', 'looking for a home', 'find a house']):
-            self.caller_intent = 'buyer'
-        elif any(w in q for w in ['sell', 'selling', 'list', 'listing', 'value my home', 'what is my home worth']):
-            self.caller_intent = 'seller'
-        elif any(w in q for w in ['rent', 'rental', 'lease', 'tenant', 'apartment', 'property management']):
-            self.caller_intent = 'renter'
+        # Detect intent and goodbye in one scan
+        with stage_seconds.time('intent'):
+            intent, self.said_goodbye, _ = self.tenant.classifier.classify(question)
+        if intent:
+            self.caller_intent = intent
 
     def add_response(self, response):
         self.conversation_history.append({"role": "assistant", "content": response})
@@ -199,14 +354,20 @@ class ConversationManager:
         return self.attempt_count >= 8
 
     def get_agent_for_intent(self):
-        if self.caller_intent == 'seller':
-            return AGENTS['sellers']
-        elif self.caller_intent == 'renter':
-            return AGENTS['rentals']
-        elif self.caller_intent == 'buyer':
-            # Alternate between buyer agents
-            return AGENTS['buyers1'] if self.attempt_count % 2 == 0 else AGENTS['buyers2']
-        return None
+        """The agent for this call, picked the first time it's needed and kept unless the intent changes
+        before a slot is agreed."""
+        agents = self.tenant.agents
+        if self.agent_key in agents and (self.agreed_slot or self.agent_intent == self.caller_intent):
+            return agents[self.agent_key]
+        previous = self.previous_call
+        if previous and previous['intent'] == self.caller_intent and previous['agent_key'] in agents:
+            agent = agents[previous['agent_key']]  # Returning callers keep the agent they had
+        else:
+            # Intents with several agents (buyers) alternate between them
+            agent = self.tenant.agent_for(self.caller_intent, self.attempt_count)
+        self.agent_key = next((key for key, a in agents.items() if a is agent), None)
+        self.agent_intent = self.caller_intent
+        return agent
 
     def get_summary(self):
         summary = "Caller: " + self.caller_id + "\n"
@@ -219,12 +380,16 @@ class ConversationManager:
     def get_full_conversation(self):
         return "\n".join(self.caller_questions)
 
-class AIAgent:
-    def answer_question(self, question, conversation_history=None):
-        if not anthropic_client:
-            return "I apologize, our system is having trouble right now."
+NO_CLIENT_ANSWER = "I apologize, our system is having trouble right now."
+FALLBACK_ANSWER = "Sorry, I'm having a little trouble right now. Please hold and someone will be right with you."
+VOICEMAIL_PROMPT = ("I'm sorry, I can't pull that up right now. Please leave your name, number, and what you're "
+                    "looking for after the tone, and an agent will call you right back.")
+BUSY_PROMPT = ("All of our lines are busy right now. Please leave your name, number, and what you're looking for "
+               "after the tone, and an agent will call you right back.")
 
-        system_prompt = f"""You are a receptionist for Bear Team Real Estate in Orlando, Florida.
+# Static system prompt — built once at import and marked for prompt caching so
+# repeat turns only pay for the conversation window
+SYSTEM_PROMPT = """You are a receptionist for Bear Team Real Estate in Orlando, Florida.
 
 CRITICAL RULES:
 1. NEVER use asterisks, markdown, bold, italics, bullet points, or any formatting. Your words are read aloud by a phone system and special characters will be spoken literally.
@@ -247,170 +412,373 @@ If they ask a question you cannot answer, say: "Great question. I will have the
 
 Do NOT ad-lib. Do NOT add extra information. Just follow the steps above."""
 
-        messages = conversation_history or []
-        if not messages or messages[-1]["content"] != question:
-            messages.append({"role": "user", "content": question})
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English speech
+    return len(text) // 4 + 4
+
+def extract_facts(conversation):
+    """Compact facts pulled from the whole call, used in place of older turns."""
+    facts = []
+    if conversation.caller_intent:
+        facts.append("Intent: " + conversation.caller_intent)
+    name = conversation.caller_name or extract_caller_name(conversation.caller_questions)
+    if name:
+        facts.append("Name: " + name)
+    spoken_phone = conversation.callback_number
+    if not spoken_phone:
+        for question in conversation.caller_questions:
+            match = PHONE_PATTERN.search(question)
+            if match:
+                spoken_phone = re.sub(r'\D', '', match.group(0))
+    facts.append("Phone: " + (spoken_phone or conversation.caller_id))
+    requested = parse_requested_time(conversation.caller_questions, conversation.tenant.tz)
+    if requested:
+        facts.append("Requested time: " + requested.slot.strftime('%A %B %d at %I:%M %p'))
+    return facts
+
+def build_history_window(history, token_budget):
+    """Keep the newest turns verbatim within the token budget. Returns (messages, folded_count)."""
+    window = []
+    used = 0
+    for message in reversed(history):
+        cost = estimate_tokens(message["content"])
+        if window and used + cost > token_budget:
+            break
+        window.append(message)
+        used += cost
+    window.reverse()
+    # The API needs the first message to come from the user
+    while len(window) > 1 and window[0]["role"] != "user":
+        window.pop(0)
+    return window, len(history) - len(window)
+
+class AIAgent:
+    def answer_question(self, question, conversation_history=None, conversation=None, context=None):
+        client = get_anthropic_client()
+        if not client:
+            return NO_CLIENT_ANSWER
+
+        history = list(conversation_history or [])
+        if not history or history[-1]["content"] != question:
+            history.append({"role": "user", "content": question})
+        messages, folded = build_history_window(history, HISTORY_TOKEN_BUDGET)
+
+        # Each tenant's prompt blocks are built when its config loads, so they stay byte-identical for caching
+        system = conversation.tenant.system_blocks if conversation else default_tenant.system_blocks
+        if folded and conversation:
+            # Older turns were dropped — give the model what it learned from them
+            facts = "Known from earlier in this call: " + "; ".join(extract_facts(conversation)) + "."
+            system = system + [{"type": "text", "text": facts}]
+        if context:
+            system = system + [{"type": "text", "text": context}]
 
         try:
-            response = anthropic_client.messages.create(
-                model="claude-sonnet-4-5-20250929",
-                max_tokens=150,
-                system=system_prompt,
-                messages=messages
-            )
+            started = time.perf_counter()
+            with admission.track():
+                response, ttft = model_guard.call(lambda: self._stream(client, system, messages))
+            finished = time.perf_counter()
+            usage = response.usage
+            stage_seconds.observe(finished - started, 'llm')
+            llm_ttft_seconds.observe(ttft)
+            print(f"LLM turn: ttft={ttft * 1000:.0f}ms total={(finished - started) * 1000:.0f}ms "
+                  f"in={usage.input_tokens} cache_read={usage.cache_read_input_tokens or 0} "
+                  f"cache_write={usage.cache_creation_input_tokens or 0} out={usage.output_tokens} "
+                  f"window={len(messages)} folded={folded}")
             return response.content[0].text
+        except CircuitOpenError:
+            return FALLBACK_ANSWER
         except Exception as e:
-            return "Sorry, I'm having a little trouble right now. Please hold and someone will be right with you."
-
+            swallowed_total.inc('llm')
+            print(f"LLM error: {e}")
+            return FALLBACK_ANSWER
+
+    def _stream(self, client, system, messages):
+        """One streamed model request. Returns (final message, seconds to first token)."""
+        started = time.perf_counter()
+        first_token = None
+        with client.messages.stream(
+            model=ANTHROPIC_MODEL,
+            max_tokens=150,
+            system=system,
+            messages=messages,
+            timeout=LLM_TIMEOUT_SECONDS
+        ) as stream:
+            for _ in stream.text_stream:
+                if first_token is None:
+                    first_token = time.perf_counter()
+            response = stream.get_final_message()
+        return response, (first_token or time.perf_counter()) - started
+
+model_guard = ModelGuard(budget_seconds=LLM_TURN_BUDGET_SECONDS, hedge=LLM_HEDGE,
+                         hedge_percentile=LLM_HEDGE_PERCENTILE, failure_threshold=LLM_BREAKER_FAILURES,
+                         reset_seconds=LLM_BREAKER_RESET_SECONDS, max_workers=max(32, ASYNC_TURN_WORKERS * 2))
+admission = AdmissionController(max_in_flight=ADMISSION_MAX_MODEL_CALLS,
+                                max_latency_seconds=ADMISSION_MAX_LATENCY_SECONDS,
+                                latency_percentile=ADMISSION_LATENCY_PERCENTILE, window_seconds=ADMISSION_WINDOW_SECONDS)
 ai_agent = AIAgent()
+turn_runner = TurnRunner(max_workers=ASYNC_TURN_WORKERS)
+prefetcher = SpeculativePrefetcher(max_workers=ASYNC_TURN_WORKERS, min_words=PREFETCH_MIN_WORDS,
+                                   min_stability=PREFETCH_MIN_STABILITY, match_ratio=PREFETCH_MATCH_RATIO,
+                                   observe=lambda result: prefetch_total.inc(result))
+script_flow = ScriptFlow(lambda questions, conversation: parse_requested_time(questions, conversation.tenant.tz),
+                         min_confidence=BOOKING_MIN_CONFIDENCE,
+                         open_slots=lambda conversation: open_slots_for(conversation),
+                         resolve_slot=lambda conversation, slot: resolve_caller_slot(conversation, slot))
+response_cache = ResponseCache(max_entries=RESPONSE_CACHE_SIZE, ttl_seconds=RESPONSE_CACHE_TTL_MINUTES * 60)
+
+def answer_turn(speech_result, conversation, cache_key=None, step=None):
+    """Model answer for a turn, remembered in the response cache when the turn is call-independent."""
+    notes = []
+    if conversation.previous_call:
+        notes.append(describe_previous_call(conversation.previous_call, conversation.tenant.tz))
+    if step == 'time':
+        # Let the model offer times that are actually open
+        openings = open_slots_for(conversation)
+        if openings:
+            conversation.openings = openings  # So a reply like "Tuesday works" can be matched to what was offered
+            notes.append("Open appointment times you can offer: "
+                         + ", ".join(AvailabilityEngine.speakable(o) for o in openings) + ".")
+    elif step == 'offer':
+        notes.append("The time the caller asked for is taken. You offered "
+                     + AvailabilityEngine.speakable(conversation.offered_slot) + " instead; they haven't accepted it yet.")
+    context = " ".join(notes) or None
+    ai_answer = ai_agent.answer_question(speech_result, list(conversation.conversation_history), conversation, context)
+    # Answers with digits are reading back call-specific details — never share those
+    if cache_key and ai_answer not in (FALLBACK_ANSWER, NO_CLIENT_ANSWER) and not re.search(r'\d', ai_answer):
+        response_cache.put(cache_key, ai_answer)
+    return ai_answer
+
+def draft_turn(conversation, text):
+    """A copy of the conversation with text added as the caller's next turn, for speculative work."""
+    draft = copy.copy(conversation)
+    draft.conversation_history = list(conversation.conversation_history)
+    draft.caller_questions = list(conversation.caller_questions)
+    draft.add_question(text)
+    return draft
+
+def prefetched_answer(future):
+    try:
+        return future.result(timeout=LLM_TURN_BUDGET_SECONDS + 1)
+    except Exception as e:
+        swallowed_total.inc('prefetch')
+        print(f"Prefetched answer error: {e}")
+        return FALLBACK_ANSWER
+
+def describe_previous_call(previous, tz=EASTERN):
+    called = datetime.fromtimestamp(previous['called_at'], tz).strftime('%B %d')
+    note = f"Returning caller: {previous['caller_name'] or 'name unknown'}, last called {called}"
+    if previous['intent']:
+        note += f" about {INTENT_PHRASES.get(previous['intent'], previous['intent'])}"
+    if previous['booked_slot']:
+        note += f", booked for {datetime.fromisoformat(previous['booked_slot']).strftime('%A %B %d at %I:%M %p')}"
+    return note + "."
+
+# ── Call History ──
+
+def new_conversation(call_sid, caller_id, tenant=None):
+    """Fresh conversation state, pre-filled from this number's last call to this tenant if there was one."""
+    tenant = tenant or default_tenant
+    conversation = ConversationManager(caller_id, tenant.key if tenant is not default_tenant else None)
+    if caller_id != 'Unknown':
+        try:
+            with stage_seconds.time('history_lookup'):
+                previous = call_history.last_call(caller_id, exclude_call_sid=call_sid, tenant=tenant.key)
+            if previous:
+                conversation.remember(previous)
+        except Exception as e:
+            swallowed_total.inc('call_history')
+            print(f"Call history lookup error: {e}")
+    return conversation
 
-# ── Google Helpers ──
-
-def get_google_credentials(scopes):
-    if GOOGLE_CREDENTIALS_JSON:
-        info = json.loads(GOOGLE_CREDENTIALS_JSON)
-        if 'private_key' in info:
-            info['private_key'] = info['private_key'].replace('\\n', '\n')
-        return Credentials.from_service_account_info(info, scopes=scopes)
-    else:
-        return Credentials.from_service_account_file(GOOGLE_CREDENTIALS_FILE, scopes=scopes)
-
-def get_sheets_client():
+def save_call_history(call_sid, conversation, booked_slot=None):
     try:
-        creds = get_google_credentials(['https://www.googleapis.com/auth/spreadsheets'])
-        return gspread.authorize(creds)
+        tenant = conversation.tenant
+        call_history.record(call_sid, conversation.caller_id, conversation.caller_intent,
+                            conversation.agent_key if conversation.get_agent_for_intent() else None,
+                            conversation.caller_name,
+                            conversation.callback_number, booked_slot.isoformat() if booked_slot else None,
+                            conversation.attempt_count, tenant.key)
     except Exception as e:
-        print(f"Sheets error: {e}")
-        return None
+        swallowed_total.inc('call_history')
+        print(f"Call history save error: {e}")
+
+# ── Google Helpers ──
 
-def get_calendar_service():
+google_clients = GoogleClients(GOOGLE_CREDENTIALS_JSON, GOOGLE_CREDENTIALS_FILE, GOOGLE_SHEET_ID)
+sheet_writer = BufferedSheetWriter(google_clients.worksheet, batch_size=SHEETS_BATCH_SIZE,
+                                   flush_interval=SHEETS_FLUSH_SECONDS, spool_path=SHEETS_SPOOL_FILE,
+                                   observe=lambda seconds: stage_seconds.observe(seconds, 'sheets'))
+if GOOGLE_SHEET_ID:
+    sheet_writer.start()
+
+def get_calendar_service(tenant=None):
     try:
-        creds = get_google_credentials(['https://www.googleapis.com/auth/calendar'])
-        return build('calendar', 'v3', credentials=creds)
+        return (tenant or default_tenant).services.google_clients.calendar()
     except Exception as e:
+        swallowed_total.inc('calendar_service')
         print(f"Calendar error: {e}")
         return None
 
-def log_to_sheets(caller_id, call_type, intent, conversation_text, agent_name='', voicemail_text=''):
-    if not GOOGLE_SHEET_ID:
+def append_to_sheet(caller_id, call_type, intent, conversation_text, agent_name='', voicemail_text='', logged_at=None,
+                    tenant=None, call_sid=None, booked_slot=None, requested_slot=None):
+    """Record the call in the local call log and queue a row for the tenant's sheet (flushed in batches)."""
+    now = datetime.fromisoformat(logged_at) if logged_at else datetime.now()
+    call_log.append(now.isoformat(), tenant or default_tenant.key, call_sid, caller_id, call_type, intent, agent_name,
+                    booked_slot, requested_slot, conversation_text, voicemail_text)
+    services = tenants.get(tenant).services
+    if not services.sheet_id:
         return
+    services.sheet_writer.append([
+        now.strftime('%Y-%m-%d'),
+        now.strftime('%I:%M %p ET'),
+        caller_id,
+        call_type,
+        intent or 'General',
+        agent_name,
+        conversation_text,
+        voicemail_text
+    ])
+    print(f"Queued log row: {call_type} from {caller_id}")
+
+availability = AvailabilityEngine(lambda: google_clients.calendar(), [a['calendar_id'] for a in AGENTS.values()],
+                                  EASTERN, BUSINESS_HOURS_START, BUSINESS_HOURS_END, BUSINESS_DAYS,
+                                  ttl_seconds=AVAILABILITY_TTL_SECONDS)
+
+def get_available_slots(days_ahead=5, intent=None, tenant=None, count=4, per_day=None):
+    """Open hourly slots for the agents who handle this intent (all agents if None)."""
+    tenant = tenant or default_tenant
+    calendar_ids = [tenant.agents[k]['calendar_id'] for k in tenant.agent_keys_for(intent)]
     try:
-        client = get_sheets_client()
-        if not client:
-            return
-        sheet = client.open_by_key(GOOGLE_SHEET_ID).sheet1
-        if sheet.row_count == 0 or sheet.cell(1, 1).value != 'Date':
-            sheet.insert_row(['Date', 'Time', 'Caller Phone', 'Call Type', 'Intent', 'Assigned Agent', 'Conversation', 'Voicemail'], 1)
-        now = datetime.now()
-        sheet.append_row([
-            now.strftime('%Y-%m-%d'),
-            now.strftime('%I:%M %p ET'),
-            caller_id,
-            call_type,
-            intent or 'General',
-            agent_name,
-            conversation_text,
-            voicemail_text
-        ])
-        print(f"Logged: {call_type} from {caller_id}")
-    except Exception as e:
-        print(f"Sheets log error: {e}")
-
-def get_available_slots(days_ahead=5):
-    if not GOOGLE_CALENDAR_ID:
-        return []
-    try:
-        service = get_calendar_service()
-        if not service:
-            return []
-        now = datetime.now(EASTERN)
-        end_date = now + timedelta(days=days_ahead)
-        events_result = service.events().list(
-            calendarId=GOOGLE_CALENDAR_ID,
-            timeMin=now.isoformat(),
-            timeMax=end_date.isoformat(),
-            singleEvents=True,
-            orderBy='startTime'
-        ).execute()
-        busy = []
-        for event in events_result.get('items', []):
-            start = event['start'].get('dateTime')
-            end = event['end'].get('dateTime')
-            if start and end:
-                busy.append((
-                    datetime.fromisoformat(start).astimezone(EASTERN),
-                    datetime.fromisoformat(end).astimezone(EASTERN)
-                ))
-        slots = []
-        check = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
-        while check < end_date and len(slots) < 4:
-            if check.weekday() in BUSINESS_DAYS and BUSINESS_HOURS_START <= check.hour < BUSINESS_HOURS_END:
-                slot_end = check + timedelta(hours=1)
-                if not any(b[0] < slot_end and b[1] > check for b in busy):
-                    slots.append(check)
-            check += timedelta(hours=1)
-        return slots
+        with stage_seconds.time('calendar_slots'):
+            return tenant.services.availability.free_slots(calendar_ids, count=count, days_ahead=days_ahead,
+                                                           per_day=per_day)
     except Exception as e:
+        swallowed_total.inc('calendar_slots')
         print(f"Calendar slots error: {e}")
         return []
 
-def book_appointment(caller_phone, slot_datetime, agent, intent):
-    if not GOOGLE_CALENDAR_ID:
+def open_slots_for(conversation, count=3):
+    """The first opening on each of the next few days, for the agents who handle this caller."""
+    return get_available_slots(intent=conversation.caller_intent, tenant=conversation.tenant, count=count, per_day=1)
+
+booking_ledger = BookingLedger(BOOKING_DB)
+booker = Booker(booking_ledger, get_calendar_service, availability)
+
+def agent_calendar(agent, tenant=None):
+    return agent.get('calendar_id') if agent else (tenant or default_tenant).calendar_id
+
+def booking_key(call_sid, caller_phone, slot_datetime):
+    return call_sid or f"{caller_phone}-{slot_datetime.isoformat()}"
+
+def appointment_event(caller_phone, slot_datetime, agent, intent, tenant=None):
+    tenant = tenant or default_tenant
+    end_time = slot_datetime + timedelta(hours=1)
+    intent_label = {'buyer': 'Buyer Consultation', 'seller': 'Listing Consultation', 'renter': 'Rental Inquiry'}.get(intent, 'Consultation')
+    return {
+        'summary': f'{tenant.short_name} — {intent_label} with {caller_phone}',
+        'description': f'Caller: {caller_phone}\nType: {intent_label}\nAgent: {agent["name"] if agent else "TBD"}\nBooked via AI phone system.',
+        'start': {'dateTime': slot_datetime.isoformat(), 'timeZone': str(tenant.tz)},
+        'end': {'dateTime': end_time.isoformat(), 'timeZone': str(tenant.tz)},
+        'reminders': {'useDefault': False, 'overrides': [
+            {'method': 'email', 'minutes': 60},
+            {'method': 'popup', 'minutes': 30}
+        ]}
+    }
+
+def insert_appointment(caller_phone, slot_datetime, agent, intent, call_sid=None, tenant=None):
+    """Insert the calendar event once per call. Raises on failure so background jobs can retry."""
+    tenant = tenants.get(tenant)
+    calendar_id = agent_calendar(agent, tenant)
+    if not calendar_id:
         return False
+    if not get_calendar_service(tenant):
+        raise RuntimeError("Calendar service unavailable")
     try:
-        service = get_calendar_service()
-        if not service:
-            return False
-        end_time = slot_datetime + timedelta(hours=1)
-        intent_label = {'buyer': 'Buyer Consultation', 'seller': 'Listing Consultation', 'renter': 'Rental Inquiry'}.get(intent, 'Consultation')
-        event = {
-            'summary': f'Bear Team — {intent_label} with {caller_phone}',
-            'description': f'Caller: {caller_phone}\nType: {intent_label}\nAgent: {agent["name"] if agent else "TBD"}\nBooked via AI phone system.',
-            'start': {'dateTime': slot_datetime.isoformat(), 'timeZone': TIMEZONE},
-            'end': {'dateTime': end_time.isoformat(), 'timeZone': TIMEZONE},
-            'reminders': {'useDefault': False, 'overrides': [
-                {'method': 'email', 'minutes': 60},
-                {'method': 'popup', 'minutes': 30}
-            ]}
-        }
-        service.events().insert(calendarId=GOOGLE_CALENDAR_ID, body=event).execute()
-        print(f"Booked: {intent_label} for {caller_phone} at {slot_datetime}")
-        return True
-    except Exception as e:
-        print(f"Calendar booking error: {e}")
+        with stage_seconds.time('calendar_booking'):
+            slot, created = tenant.services.booker.book(
+                booking_key(call_sid, caller_phone, slot_datetime), calendar_id, slot_datetime,
+                lambda s: appointment_event(caller_phone, s, agent, intent, tenant))
+    except SlotTaken:
+        notify_slot_taken(caller_phone, slot_datetime, agent, tenant)
         return False
+    if created:
+        print(f"Booked: {intent or 'consultation'} for {caller_phone} at {slot}")
+    else:
+        print(f"Already booked for {caller_phone} at {slot} — skipping duplicate")
+    return True
+
+def notify_slot_taken(caller_phone, slot_datetime, agent, tenant):
+    """The caller was told they're booked, but the slot went to someone else first — have the agent rebook them."""
+    when = slot_datetime.strftime('%A, %B %d at %I:%M %p ET')
+    body = (f"PLEASE RESCHEDULE — {tenant.name}\n" + "=" * 50 + "\n\n"
+            f"Caller Phone: {caller_phone}\n"
+            f"Agreed Time: {when}\n"
+            f"Agent: {agent['name'] if agent else 'TBD'}\n\n"
+            "This slot was taken on the calendar before the caller's booking went through, so nothing was booked.\n"
+            "The lead email for this call says the appointment is booked — please call them to pick another time.\n")
+    print(f"Slot taken before booking: {caller_phone} at {slot_datetime}")
+    job_queue.enqueue('send_email', subject=f"{tenant.short_name} — Please reschedule {caller_phone}", body=body,
+                      tenant=tenant.key)
+
+def resolve_booking_slot(agent, slot_datetime, tenant=None):
+    """The slot we'll actually book: as requested if free, else the nearest opening (None if nothing fits)."""
+    tenant = tenant or default_tenant
+    calendar_id = agent_calendar(agent, tenant)
+    if not calendar_id:
+        return slot_datetime
+    try:
+        return tenant.services.booker.resolve_slot(calendar_id, slot_datetime)
+    except Exception as e:
+        swallowed_total.inc('availability')
+        print(f"Calendar availability error: {e}")
+        return slot_datetime
+
+def resolve_caller_slot(conversation, slot_datetime):
+    """resolve_booking_slot against the calendar of the agent this call goes to."""
+    return resolve_booking_slot(conversation.get_agent_for_intent(), slot_datetime, conversation.tenant)
 
 # ── Email Helper ──
 
-def send_email(subject, body):
-    if not GMAIL_ADDRESS or not GMAIL_APP_PASSWORD or not NOTIFICATION_EMAIL:
+mailer = Mailer(SMTP_HOST, SMTP_PORT, GMAIL_ADDRESS, GMAIL_APP_PASSWORD, GMAIL_ADDRESS, NOTIFICATION_EMAIL,
+                starttls=SMTP_STARTTLS, idle_timeout=SMTP_IDLE_SECONDS, digest_minutes=EMAIL_DIGEST_MINUTES,
+                digest_subject="Bear Team — Inquiry digest")
+mailer.start()
+
+def deliver_email(subject, body, low_priority=False, tenant=None):
+    """Send one notification email through the tenant's mailer. Raises on failure so background jobs can retry."""
+    tenant_mailer = tenants.get(tenant).services.mailer
+    if not tenant_mailer.configured():
         print("Email not configured")
         return
-    server = None
-    try:
-        msg = MIMEMultipart()
-        msg['From'] = GMAIL_ADDRESS
-        msg['To'] = NOTIFICATION_EMAIL
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain'))
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-        server.send_message(msg)
-        print(f"Email sent: {subject}")
-    except Exception as e:
-        print(f"Email error: {e}")
-    finally:
-        if server:
-            try:
-                server.quit()
-            except Exception:
-                pass
+    if low_priority and tenant_mailer.digest_minutes:
+        # Parked as a job until its digest goes out, so a restart can't lose it
+        job_queue.enqueue('email_digest', delay=tenant_mailer.next_digest_in(), subject=subject, body=body,
+                          tenant=tenant)
+        return
+    with stage_seconds.time('smtp'):
+        tenant_mailer.send(subject, body)
+
+def send_digests(payloads):
+    """Due digest items as one email per mailer. Each item's job stays pending until its digest is sent."""
+    groups = {}
+    for i, p in enumerate(payloads):
+        tenant = tenants.get(p.get('tenant'))
+        groups.setdefault(id(tenant.services), (tenant, []))[1].append(i)
+    errors = [None] * len(payloads)
+    for tenant, indexes in groups.values():
+        try:
+            with stage_seconds.time('smtp'):
+                tenant.services.mailer.send_digest([(payloads[i]['subject'], payloads[i]['body']) for i in indexes])
+        except Exception as e:
+            for i in indexes:
+                errors[i] = e
+    return errors
 
-def send_lead_email(conversation, agent, booked_slot=None):
+def send_lead_email(conversation, agent, booked_slot=None, requested_slot=None, call_sid=None):
+    tenant = conversation.tenant
     intent = conversation.caller_intent or 'general'
     intent_label = {'buyer': 'BUYER LEAD', 'seller': 'SELLER LEAD', 'renter': 'RENTAL INQUIRY'}.get(intent, 'NEW INQUIRY')
-    body = f"{intent_label} — Bear Team Real Estate\n"
+    body = f"{intent_label} — {tenant.name}\n"
     body += "=" * 50 + "\n\n"
     body += f"Caller Phone: {conversation.caller_id}\n"
     body += f"Call Time: {datetime.now().strftime('%Y-%m-%d %I:%M %p ET')}\n"
@@ -420,152 +788,440 @@ def send_lead_email(conversation, agent, booked_slot=None):
         body += f"Agent Phone: {agent['phone']}\n"
     if booked_slot:
         body += f"\nAPPOINTMENT BOOKED: {booked_slot.strftime('%A, %B %d at %I:%M %p ET')}\n"
+    elif requested_slot:
+        body += f"\nREQUESTED TIME (not booked, please confirm): {requested_slot.strftime('%A, %B %d at %I:%M %p ET')}\n"
     body += f"\nCONVERSATION:\n{'-'*50}\n{conversation.get_full_conversation()}\n{'-'*50}\n"
     body += f"\nACTION: Call {conversation.caller_id} to follow up.\n"
-    log_to_sheets(conversation.caller_id, intent_label, intent, conversation.get_full_conversation(),
-                  agent['name'] if agent else '')
-    send_email(f"Bear Team — {intent_label} from {conversation.caller_id}", body)
-
-def send_voicemail_email(conversation, voicemail_text):
-    body = f"New Voicemail — Bear Team Real Estate\n\n{conversation.get_summary()}\nMessage: {voicemail_text}"
-    log_to_sheets(conversation.caller_id, 'Voicemail', conversation.caller_intent,
-                  conversation.get_full_conversation(), '', voicemail_text)
-    send_email(f"Bear Team — Voicemail from {conversation.caller_id}", body)
+    job_queue.enqueue('log_to_sheets', caller_id=conversation.caller_id, call_type=intent_label, intent=intent,
+                      conversation_text=conversation.get_full_conversation(),
+                      agent_name=agent['name'] if agent else '', logged_at=datetime.now().isoformat(),
+                      tenant=conversation.tenant_key, call_sid=call_sid,
+                      booked_slot=booked_slot.isoformat() if booked_slot else None,
+                      requested_slot=requested_slot.isoformat() if requested_slot else None)
+    # General inquiries with nobody to route to and no booking can wait for the digest
+    low_priority = not agent and not booked_slot and not requested_slot
+    job_queue.enqueue('send_email', subject=f"{tenant.short_name} — {intent_label} from {conversation.caller_id}",
+                      body=body, low_priority=low_priority, tenant=conversation.tenant_key)
+
+def send_voicemail_email(conversation, voicemail_text, call_sid=None):
+    tenant = conversation.tenant
+    body = f"New Voicemail — {tenant.name}\n\n{conversation.get_summary()}\nMessage: {voicemail_text}"
+    job_queue.enqueue('log_to_sheets', caller_id=conversation.caller_id, call_type='Voicemail',
+                      intent=conversation.caller_intent, conversation_text=conversation.get_full_conversation(),
+                      voicemail_text=voicemail_text, logged_at=datetime.now().isoformat(),
+                      tenant=conversation.tenant_key, call_sid=call_sid)
+    job_queue.enqueue('send_email', subject=f"{tenant.short_name} — Voicemail from {conversation.caller_id}", body=body,
+                      tenant=conversation.tenant_key)
+
+# ── Tenants ──
+# The constants at the top of this file are the default tenant. Files in
+# TENANTS_DIR add more brokerages, each answering on its own Twilio numbers
+# with its own Google and SMTP accounts. Secrets stay in the environment: a
+# tenant file names the variables to read them from.
+
+default_tenant = Tenant('default', {
+    'name': BROKERAGE_NAME, 'short_name': 'Bear Team', 'city': BROKERAGE_CITY,
+    'numbers': [TWILIO_PHONE_NUMBER] if TWILIO_PHONE_NUMBER else [], 'timezone': TIMEZONE,
+    'business_hours': (BUSINESS_HOURS_START, BUSINESS_HOURS_END), 'business_days': BUSINESS_DAYS,
+    'agents': AGENTS, 'routing': INTENT_AGENT_KEYS, 'google': {'calendar_id': GOOGLE_CALENDAR_ID}
+}, classifier=call_classifier, prompt=SYSTEM_PROMPT)
+default_tenant.services = TenantServices(google_clients, sheet_writer, mailer, availability, booker, GOOGLE_SHEET_ID)
+
+def build_tenant_services(tenant):
+    """Clients for a tenant file's Google and SMTP settings, shared by tenants with the same settings."""
+    google = tenant.config.get('google', {})
+    email = tenant.config.get('email', {})
+    clients = GoogleClients(os.environ.get(google.get('credentials_json_env', '')) or None,
+                            google.get('credentials_file', GOOGLE_CREDENTIALS_FILE), google.get('sheet_id'))
+    writer = BufferedSheetWriter(clients.worksheet, batch_size=SHEETS_BATCH_SIZE, flush_interval=SHEETS_FLUSH_SECONDS,
+                                 spool_path=f"{os.path.splitext(SHEETS_SPOOL_FILE)[0]}.{tenant.key}.jsonl",
+                                 observe=lambda seconds: stage_seconds.observe(seconds, 'sheets'))
+    tenant_mailer = Mailer(email.get('host', SMTP_HOST), email.get('port', SMTP_PORT), email.get('username'),
+                           os.environ.get(email.get('password_env', '')) or None, email.get('sender'),
+                           email.get('recipient'), starttls=email.get('starttls', SMTP_STARTTLS),
+                           idle_timeout=SMTP_IDLE_SECONDS, digest_minutes=email.get('digest_minutes', EMAIL_DIGEST_MINUTES),
+                           digest_subject=f"{tenant.short_name} — Inquiry digest")
+    tenant_availability = AvailabilityEngine(lambda: clients.calendar(), tenant.calendar_ids, tenant.tz,
+                                             tenant.hours_start, tenant.hours_end, tenant.business_days,
+                                             ttl_seconds=AVAILABILITY_TTL_SECONDS)
+    services = TenantServices(clients, writer, tenant_mailer, tenant_availability,
+                              Booker(booking_ledger, lambda: clients.calendar(), tenant_availability),
+                              google.get('sheet_id'))
+    services.start()
+    return services
+
+tenants = TenantRegistry(TENANTS_DIR, default_tenant, build_tenant_services, reload_seconds=TENANT_RELOAD_SECONDS)
+tenants.start()
+
+def tenant_services():
+    """Each distinct set of tenant clients once."""
+    return list({id(t.services): t.services for t in tenants.all()}.values())
+
+# ── Background Jobs ──
+# End-of-call side effects run on worker threads so the hangup TwiML goes
+# back to Twilio right away. Jobs survive restarts and retry with backoff.
+
+job_queue = JobQueue(JOB_QUEUE_DB, workers=JOB_WORKERS)
+
+@job_queue.handler('book_appointment', batch_size=BOOKING_BATCH_SIZE)
+def run_booking_jobs(payloads):
+    """One booking inserts directly; a backlog goes to Calendar as a single batch request."""
+    if len(payloads) == 1:
+        p = payloads[0]
+        insert_appointment(p['caller_phone'], datetime.fromisoformat(p['slot']), p['agent'], p['intent'],
+                           p.get('call_sid'), p.get('tenant'))
+        return [None]
+    # One batch per set of tenant clients — each tenant books with its own credentials
+    batches, keys = {}, []
+    for p in payloads:
+        tenant = tenants.get(p.get('tenant'))
+        calendar_id = agent_calendar(p['agent'], tenant)
+        slot = datetime.fromisoformat(p['slot'])
+        key = booking_key(p.get('call_sid'), p['caller_phone'], slot)
+        keys.append(key if calendar_id else None)
+        if calendar_id:
+            batch = batches.setdefault(id(tenant.services), (tenant, []))[1]
+            batch.append((key, calendar_id, slot,
+                          lambda s, p=p, t=tenant: appointment_event(p['caller_phone'], s, p['agent'], p['intent'], t)))
+    results = {}
+    for tenant, requests in batches.values():
+        if not get_calendar_service(tenant):
+            raise RuntimeError("Calendar service unavailable")
+        with stage_seconds.time('calendar_booking'):
+            results.update(tenant.services.booker.book_many(requests))
+    booked = sum(1 for e in results.values() if e is None)
+    for p, key in zip(payloads, keys):
+        if isinstance(results.get(key), SlotTaken):
+            # Retrying can't free the slot — hand it to the agent and finish the job
+            notify_slot_taken(p['caller_phone'], datetime.fromisoformat(p['slot']), p['agent'],
+                              tenants.get(p.get('tenant')))
+            results[key] = None
+    print(f"Batch booked {booked}/{len(results)} appointments")
+    return [results.get(key) if key else None for key in keys]
+
+job_queue.handler('log_to_sheets')(append_to_sheet)
+job_queue.handler('send_email')(deliver_email)
+job_queue.handler('email_digest', batch_size=EMAIL_DIGEST_MAX_ITEMS)(send_digests)
+job_queue.start()
 
 # ── Time Parsing Helper ──
 
-def parse_requested_time(caller_questions):
+def parse_requested_time(caller_questions, tz=EASTERN):
     """Parse a day and time from what the caller said during the conversation."""
-    # Only look at the last few messages where scheduling was likely discussed
-    recent_text = " ".join(caller_questions[-4:]).lower()
+    with stage_seconds.time('time_parse'):
+        return parse_time(caller_questions, tz)
 
-    now = datetime.now(EASTERN)
-    target_date = None
+# ── Startup ──
 
-    day_map = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
-               'friday': 4, 'saturday': 5, 'sunday': 6}
-
-    if 'today' in recent_text:
-        target_date = now.date()
-    elif 'tomorrow' in recent_text:
-        target_date = (now + timedelta(days=1)).date()
-    else:
-        for day_name, day_num in day_map.items():
-            if day_name in recent_text:
-                days_ahead = (day_num - now.weekday()) % 7
-                if days_ahead == 0:
-                    days_ahead = 7  # Next week if today
-                target_date = (now + timedelta(days=days_ahead)).date()
-                break
-
-    if not target_date:
-        return None
-
-    # Find the time — look for patterns near time-related context
-    # Match "at 5", "5:00 PM", "5 PM", "5 o'clock", "at 2:30 pm"
-    target_hour = 10  # Default to 10 AM
-    target_minute = 0
-
-    # First try to match time with AM/PM (most reliable)
-    time_match = re.search(r'(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)', recent_text)
-    if not time_match:
-        # Try "at 5" or "at 5:00" or "5 o'clock" patterns (no AM/PM)
-        time_match = re.search(r'(?:at\s+)(\d{1,2})(?::(\d{2}))?(?:\s*o.?clock)?', recent_text)
-    if not time_match:
-        # Try patterns like "monday 5" or "tuesday 3:30"
-        day_names = '|'.join(day_map.keys())
-        time_match = re.search(r'(?:' + day_names + r')\s+(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?', recent_text)
-
-    if time_match:
-        hour = int(time_match.group(1))
-        minute = int(time_match.group(2)) if time_match.group(2) else 0
-        ampm = time_match.group(3) if time_match.lastindex >= 3 else None
-
-        if ampm and ('pm' in ampm or 'p.m' in ampm):
-            if hour != 12:
-                hour += 12
-        elif ampm and ('am' in ampm or 'a.m' in ampm):
-            if hour == 12:
-                hour = 0
-        else:
-            # No AM/PM — assume PM for 1-6, AM for 7-11
-            if 1 <= hour <= 6:
-                hour += 12
+def warm_up(prime=False):
+    """Load the heavy client libraries. With prime=True also open the Anthropic, Google and SMTP connections
+    and refresh cached availability, so the next caller after a quiet spell doesn't pay for any of it.
+    Returns how long each step took."""
+    started = time.perf_counter()
+    steps, errors = {}, {}
 
-        target_hour = hour
-        target_minute = minute
-
-    try:
-        slot = EASTERN.localize(datetime(target_date.year, target_date.month, target_date.day,
-                                         target_hour, target_minute))
-        return slot
-    except Exception as e:
-        print(f"Time parse error: {e}")
-        return None
+    def step(name, fn):
+        step_started = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            swallowed_total.inc('warm_up')
+            errors[name] = str(e)
+            print(f"Warm-up {name} error: {e}")
+        steps[name] = round((time.perf_counter() - step_started) * 1000, 1)
+
+    step('anthropic', get_anthropic_client)
+    if prime and get_anthropic_client():
+        step('anthropic_connection', lambda: get_anthropic_client().models.list(limit=1))
+    step('twilio', get_twilio_client)
+    warmed = set()
+    for tenant in tenants.all():
+        services = tenant.services
+        if id(services) in warmed:
+            continue  # Tenants sharing clients only need them warmed once
+        warmed.add(id(services))
+        calendars = services.availability.calendar_ids
+        if services.sheet_id or calendars:
+            step(f'google:{tenant.key}', services.google_clients.warm_up)
+        if not prime:
+            continue
+        if calendars:
+            step(f'calendar:{tenant.key}', services.google_clients.calendar)
+            step(f'availability:{tenant.key}', services.availability.refresh)
+        if services.sheet_id:
+            step(f'sheets:{tenant.key}', services.google_clients.worksheet)
+        if services.mailer.configured():
+            step(f'smtp:{tenant.key}', services.mailer.warm_up)
+    total = round((time.perf_counter() - started) * 1000, 1)
+    print(f"Warm-up finished in {total:.0f}ms")
+    return {"total_ms": total, "steps_ms": steps, "errors": errors, "finished_at": datetime.now().isoformat()}
+
+last_warm_up = None  # (time, report) from the last /warmup
+last_call_at = None  # When Twilio last sent a real call webhook — keep_alive backs off only while calls keep coming
+_warm_up_lock = threading.Lock()
+
+def shutdown():
+    """Stop the job workers, then write out buffered Sheets rows and close SMTP connections for every tenant.
+    atexit doesn't run when the process is killed by a signal, so run.py calls this on SIGTERM."""
+    job_queue.stop()
+    for services in tenant_services():
+        try:
+            services.close()
+        except Exception as e:
+            print(f"Shutdown error: {e}")
 
 # ── Flask Routes ──
 
+@app.before_request
+def start_request_timer():
+    global last_call_at
+    g.started = time.perf_counter()
+    if request.endpoint in ('handle_incoming_call', 'process_speech'):
+        last_call_at = time.time()
+
+@app.after_request
+def record_request_latency(response):
+    started = getattr(g, 'started', None)
+    if started is not None and request.url_rule:
+        request_seconds.observe(time.perf_counter() - started, request.url_rule.rule)
+    return response
+
+# ── Webhook Deduplication ──
+
+webhooks = WebhookDeduplicator(max_entries=WEBHOOK_DEDUPE_SIZE, ttl_seconds=WEBHOOK_DEDUPE_TTL_SECONDS,
+                               wait_seconds=WEBHOOK_DEDUPE_WAIT_SECONDS)
+
+def deduplicate(key_for):
+    """Run the view once per key_for() value so Twilio's retries get the stored TwiML. None keys always run."""
+    def decorate(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = key_for()
+            if key is None:
+                return view(*args, **kwargs)
+            try:
+                result, replayed = webhooks.run(key, lambda: view(*args, **kwargs))
+            except TimeoutError as e:
+                print(f"Webhook retry gave up waiting: {e}")
+                return '', 503
+            if replayed:
+                webhook_duplicates_total.inc(request.url_rule.rule)
+            return result
+        return wrapper
+    return decorate
+
+def twilio_retry_key():
+    # Twilio sends the same idempotency token on every retry of one request
+    token = request.headers.get('I-Twilio-Idempotency-Token')
+    return (request.path, token) if token else None
+
+def speech_key():
+    # The turn number in the action URL keeps a caller saying "yes" twice apart from a retry
+    turn = request.args.get('turn')
+    if turn is None:
+        return twilio_retry_key()  # TwiML from before the turn number was added
+    return (request.path, request.values.get('CallSid'), turn, request.values.get('SpeechResult'))
+
+def transcription_key():
+    return (request.path, request.values.get('CallSid'),
+            request.values.get('TranscriptionSid') or request.values.get('TranscriptionText'))
+
+def speech_gather(turn, **options):
+    if PREFETCH:
+        options.update(partial_result_callback=BASE_URL + '/partial_speech', partial_result_callback_method='POST')
+    return Gather(input='speech', action=f"{BASE_URL}/process_speech?turn={turn}", speech_timeout='auto', **options)
+
 @app.route("/voice", methods=['GET', 'POST'])
 def handle_incoming_call():
     response = VoiceResponse()
     caller_id = request.values.get('From', 'Unknown')
     call_sid = request.values.get('CallSid', 'Unknown')
+    tenant = tenants.for_number(request.values.get('To'))
     if call_sid not in conversations:
-        conversations[call_sid] = ConversationManager(caller_id)
-    response.say("Thank you for calling Bear Team Real Estate in Orlando! How can I help you today?",
-                 voice='Google.en-US-Neural2-F', language='en-US')
-    gather = Gather(input='speech', action=BASE_URL + '/process_speech', speech_timeout='auto', language='en-US')
+        calls_total.inc()
+        admitted, reason = admission.admit()
+        if not admitted:
+            # Overloaded — take a message rather than queue another caller behind the model.
+            # Calls already in progress never get here, so they keep their capacity.
+            calls_shed_total.inc(reason)
+            print(f"Shedding call {call_sid} to voicemail ({reason})")
+            conversations.save(call_sid, new_conversation(call_sid, caller_id, tenant))
+            response.say(f"Thank you for calling {tenant.name}.", voice='Google.en-US-Neural2-F', language='en-US')
+            return voicemail_fallback(response, tenant, BUSY_PROMPT)
+    conversation = conversations.get_or_create(call_sid, lambda: new_conversation(call_sid, caller_id, tenant))
+    if conversation.caller_name and not conversation.caller_questions:
+        greeting = tenant.returning_greeting.format(first_name=conversation.caller_name.split()[0])
+    else:
+        greeting = tenant.greeting
+    response.say(greeting, voice='Google.en-US-Neural2-F', language='en-US')
+    gather = speech_gather(conversation.attempt_count, language='en-US')
     response.append(gather)
     response.redirect(BASE_URL + '/voice')
     return str(response)
 
 @app.route("/process_speech", methods=['POST'])
+@deduplicate(speech_key)
 def process_speech():
     response = VoiceResponse()
     speech_result = request.values.get('SpeechResult', '').strip()
     call_sid = request.values.get('CallSid', 'Unknown')
     caller_id = request.values.get('From', 'Unknown')
-    if call_sid not in conversations:
-        conversations[call_sid] = ConversationManager(caller_id)
-    conversation = conversations[call_sid]
+    conversation = conversations.get_or_create(
+        call_sid, lambda: new_conversation(call_sid, caller_id, tenants.for_number(request.values.get('To'))))
     if not speech_result:
         response.say("Sorry, I didn't catch that. Could you repeat that?", voice='Google.en-US-Neural2-F')
         response.redirect(BASE_URL + '/voice')
         return str(response)
+    step = script_flow.expected_step(conversation)
     conversation.add_question(speech_result)
 
+    # Predictable script steps are answered from templates without a model call
+    local_answer = script_flow.handle(conversation, step, speech_result)
+    if local_answer:
+        turns_total.inc('script')
+        if script_flow.expected_step(conversation):
+            conversation.said_goodbye = False  # "Yes, thank you" answered a question — the script has more to ask
+        prefetcher.discard(call_sid)
+        return finish_turn(call_sid, caller_id, conversation, local_answer)
+
+    # Common openers get the same answer every time — skip the model for those
+    cache_key = None
+    # Returning callers' answers are built with their previous call as context, so they aren't shared
+    if conversation.attempt_count <= RESPONSE_CACHE_MAX_TURN and not conversation.caller_name \
+            and not conversation.previous_call:
+        cache_key = response_cache.key(speech_result, step, conversation.tenant.key)
+        cached_answer = response_cache.get(cache_key) if cache_key else None
+        if cached_answer:
+            turns_total.inc('cache')
+            prefetcher.discard(call_sid)
+            return finish_turn(call_sid, caller_id, conversation, cached_answer)
+
+    if not model_guard.available():
+        # The model API keeps failing — take a message instead of making the caller wait on it
+        turns_total.inc('voicemail')
+        prefetcher.discard(call_sid)
+        conversations.save(call_sid, conversation)
+        return voicemail_fallback(response, conversation.tenant)
+
+    turns_total.inc('model')
+    # A model call started from the caller's partial speech, if it heard the same words
+    prefetched = prefetcher.claim(call_sid, speech_result)
+    if prefetched and prefetched.done():
+        return finish_turn(call_sid, caller_id, conversation, prefetched_answer(prefetched))
+    if ASYNC_TURNS:
+        # Start the model call in the background and hold the caller until it's ready
+        conversations.save(call_sid, conversation)
+        if prefetched:
+            turn_runner.adopt(call_sid, prefetched, speech_result, caller_id)
+        else:
+            turn_runner.start(call_sid, speech_result, caller_id, answer_turn, speech_result, conversation, cache_key,
+                              step)
+        if HOLD_FILLER:
+            response.say(HOLD_FILLER, voice='Google.en-US-Neural2-F', language='en-US')
+        response.pause(length=ANSWER_POLL_SECONDS)
+        response.redirect(BASE_URL + '/answer/' + call_sid)
+        return str(response)
+
     # Let the AI handle the conversation naturally — it will ask for name, number, and appointment time
-    ai_answer = ai_agent.answer_question(speech_result, conversation.conversation_history)
+    if prefetched:
+        ai_answer = prefetched_answer(prefetched)
+    else:
+        ai_answer = answer_turn(speech_result, conversation, cache_key, step)
+    return finish_turn(call_sid, caller_id, conversation, ai_answer)
+
+@app.route("/partial_speech", methods=['POST'])
+def partial_speech():
+    """Twilio's partialResultCallback: start the model early once the caller's words settle."""
+    call_sid = request.values.get('CallSid', 'Unknown')
+    text = (request.values.get('UnstableSpeechResult') or request.values.get('StableSpeechResult') or '').strip()
+    stability = request.values.get('Stability', type=float)
+    if not PREFETCH or not text or not prefetcher.is_stable(call_sid, text, stability):
+        return '', 204
+    conversation = conversations.get(call_sid)
+    if conversation is None or not model_guard.available() or admission.overload_reason():
+        return '', 204
+    step = script_flow.expected_step(conversation)
+    draft = draft_turn(conversation, text)
+    if script_flow.would_answer(copy.copy(draft), step, text):
+        return '', 204  # The script will answer this turn without the model
+    prefetcher.start(call_sid, text, answer_turn, text, draft, None, step)
+    return '', 204
+
+@app.route("/answer/<call_sid>", methods=['GET', 'POST'])
+@deduplicate(twilio_retry_key)
+def answer(call_sid):
+    response = VoiceResponse()
+    turn = turn_runner.get(call_sid)
+    if not turn:
+        response.redirect(BASE_URL + '/voice')
+        return str(response)
+    if not turn.future.done():
+        turn.polls += 1
+        if turn.polls < ANSWER_MAX_POLLS:
+            response.pause(length=ANSWER_POLL_SECONDS)
+            response.redirect(BASE_URL + '/answer/' + call_sid)
+            return str(response)
+    turn_runner.pop(call_sid)
+    if turn.future.done():
+        ai_answer = turn.future.result()
+    else:
+        ai_answer = FALLBACK_ANSWER
+    conversation = conversations.get_or_create(call_sid, lambda: new_conversation(call_sid, turn.caller_id))
+    if ai_answer == FALLBACK_ANSWER and not model_guard.available():
+        return voicemail_fallback(response, conversation.tenant)
+    return finish_turn(call_sid, turn.caller_id, conversation, ai_answer)
+
+def voicemail_fallback(response, tenant=None, prompt=VOICEMAIL_PROMPT):
+    """Record a message for the agents; /handle_transcription emails it."""
+    response.say(prompt, voice='Google.en-US-Neural2-F', language='en-US')
+    response.record(action=BASE_URL + '/handle_voicemail', max_length=120, play_beep=True, transcribe=True,
+                    transcribe_callback=BASE_URL + '/handle_transcription')
+    response.say((tenant or default_tenant).goodbye, voice='Google.en-US-Neural2-F')
+    response.hangup()
+    return str(response)
+
+def finish_turn(call_sid, caller_id, conversation, ai_answer):
+    response = VoiceResponse()
     # Strip ALL markdown/formatting characters that TTS would read aloud
     ai_answer = re.sub(r'[*#_~`\[\]()>]', '', ai_answer)
     ai_answer = re.sub(r'\s+', ' ', ai_answer).strip()
     conversation.add_response(ai_answer)
+    conversations.save(call_sid, conversation)
+    save_call_history(call_sid, conversation)
 
     # Check if caller wants to end the call
-    goodbye_words = ['bye', 'goodbye', 'thank you', 'thanks', 'that is all', "that's all", 'no thanks', 'nothing else', 'have a good day']
-    is_goodbye = any(w in speech_result.lower() for w in goodbye_words)
-
-    if is_goodbye or conversation.should_escalate():
+    if conversation.said_goodbye or conversation.should_escalate():
         # Conversation is wrapping up — send lead email and book appointment
+        call_turns.observe(conversation.attempt_count)
+        if not conversation.said_goodbye:
+            escalations_total.inc()
+        tenant = conversation.tenant
+        # Only a slot the caller was told about and accepted is booked; anything else goes to the agent to confirm
+        booked_slot = conversation.agreed_slot
         agent = conversation.get_agent_for_intent()
-        # Try to parse a requested day/time from the conversation
-        booked_slot = parse_requested_time(conversation.caller_questions)
+        requested = parse_requested_time(conversation.caller_questions, tenant.tz)
         if booked_slot:
-            book_appointment(caller_id, booked_slot, agent, conversation.caller_intent)
-            send_lead_email(conversation, agent, booked_slot)
+            save_call_history(call_sid, conversation, booked_slot)
+            job_queue.enqueue('book_appointment', caller_phone=caller_id, slot=booked_slot.isoformat(),
+                              agent=agent, intent=conversation.caller_intent, call_sid=call_sid,
+                              tenant=conversation.tenant_key)
+            send_lead_email(conversation, agent, booked_slot, call_sid=call_sid)
+        elif requested:
+            # Not sure enough to book — pass what we heard to the agent instead
+            send_lead_email(conversation, agent, requested_slot=requested.slot, call_sid=call_sid)
         else:
             # No specific time found — just send the lead email
-            send_lead_email(conversation, agent)
+            send_lead_email(conversation, agent, call_sid=call_sid)
         response.say(ai_answer, voice='Google.en-US-Neural2-F', language='en-US')
-        response.say("Thanks for calling Bear Team Real Estate! Have a great day!", voice='Google.en-US-Neural2-F')
+        response.say(tenant.goodbye, voice='Google.en-US-Neural2-F')
         response.hangup()
         return str(response)
 
     # Continue the conversation — let AI keep talking to the caller
     response.say(ai_answer, voice='Google.en-US-Neural2-F', language='en-US')
-    gather = Gather(input='speech', action=BASE_URL + '/process_speech', speech_timeout='auto', timeout=8)
+    gather = speech_gather(conversation.attempt_count, timeout=8)
     response.append(gather)
-    response.say("Are you still there? If not, thanks for calling Bear Team Real Estate!", voice='Google.en-US-Neural2-F')
+    response.say(conversation.tenant.still_there, voice='Google.en-US-Neural2-F')
     response.hangup()
     return str(response)
 
@@ -577,16 +1233,85 @@ def handle_voicemail():
     return str(response)
 
 @app.route("/handle_transcription", methods=['POST'])
+@deduplicate(transcription_key)
 def handle_transcription():
     call_sid = request.values.get('CallSid', 'Unknown')
     transcription = request.values.get('TranscriptionText', '')
-    if call_sid in conversations:
-        send_voicemail_email(conversations[call_sid], transcription)
+    conversation = conversations.get(call_sid)
+    if conversation:
+        send_voicemail_email(conversation, transcription, call_sid)
     return '', 200
 
 @app.route("/status")
 def status():
-    return {"status": "running", "brokerage": BROKERAGE_NAME, "base_url": BASE_URL or "NOT SET"}
+    return {"status": "running", "brokerage": BROKERAGE_NAME, "base_url": BASE_URL or "NOT SET",
+            "conversations": conversations.stats(), "script": script_flow.stats(),
+            "response_cache": response_cache.stats(), "availability": availability.stats(),
+            "model": model_guard.stats(), "admission": admission.stats(), "prefetch": prefetcher.stats(),
+            "webhooks": webhooks.stats(),
+            "call_history": call_history.stats(), "tenants": tenants.stats()}
+
+@app.route("/warmup", methods=['GET', 'POST'])
+def warmup():
+    """Prime connections and caches (called by keep_alive.py). Repeat calls within the minimum interval
+    get the previous report instead of hitting the APIs again."""
+    global last_warm_up
+    with _warm_up_lock:
+        since_call = round(time.time() - last_call_at) if last_call_at else None
+        if last_warm_up and time.time() - last_warm_up[0] < WARMUP_MIN_INTERVAL_SECONDS:
+            return dict(last_warm_up[1], cached=True, seconds_since_last_call=since_call)
+        report = warm_up(prime=True)
+        last_warm_up = (time.time(), report)
+    return dict(report, cached=False, seconds_since_last_call=since_call)
+
+@app.route("/metrics")
+def metrics_endpoint():
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+def export_authorized():
+    if not EXPORT_TOKEN:
+        return False
+    header = request.headers.get('Authorization', '')
+    token = header[7:] if header.startswith('Bearer ') else request.args.get('token', '')
+    return hmac.compare_digest(token.encode(), EXPORT_TOKEN.encode())
+
+def export_filters():
+    return {"start": request.args.get('from'), "end": request.args.get('to'), "intent": request.args.get('intent'),
+            "agent": request.args.get('agent'), "tenant": request.args.get('tenant')}
+
+@app.route("/export")
+def export():
+    """Stream the call log as CSV (default) or NDJSON, filtered by from/to (YYYY-MM-DD), intent, agent, tenant."""
+    if not export_authorized():
+        return {"error": "unauthorized"}, 401
+    filters = export_filters()
+    if request.args.get('format') == 'ndjson':
+        return Response(stream_with_context(call_log.export_ndjson(**filters)), content_type='application/x-ndjson')
+    return Response(stream_with_context(call_log.export_csv(**filters)), content_type='text/csv; charset=utf-8',
+                    headers={'Content-Disposition': 'attachment; filename="call_log.csv"'})
+
+@app.route("/report")
+def report():
+    """Daily calls, intents, agents, bookings and voicemails, read from totals kept up to date as calls are logged."""
+    if not export_authorized():
+        return {"error": "unauthorized"}, 401
+    filters = export_filters()
+    return {"days": call_log.report(filters["start"], filters["end"], filters["tenant"])}
+
+@app.route("/jobs")
+def jobs():
+    stats = job_queue.stats()
+    services = tenant_services()
+    stats["mailer"] = {"digest": job_queue.depth('email_digest')}
+    stats["sheets_pending_rows"] = sum(s.sheet_writer.pending() for s in services)
+    return stats
+
+@app.route("/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.status(job_id)
+    if not job:
+        return {"error": "not found"}, 404
+    return job
 
 @app.route("/")
 def home():
@@ -0,0 +1,67 @@
+"""Accuracy and throughput of the compiled classifier vs the old substring checks.
+
+    python benchmarks/classifier_bench.py [iterations]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from classifier import CallClassifier
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'utterance_corpus.json')
+
+
+def legacy_classify(text):
+    # The checks ConversationManager.add_question and process_speech used before
+    q = text.lower()
+    intent = None
+    if any(w in q for w in ['buy', 'buying', 'purchase', 'looking for a home', 'find a house']):
+        intent = 'buyer'
+    elif any(w in q for w in ['sell', 'selling', 'list', 'listing', 'value my home', 'what is my home worth']):
+        intent = 'seller'
+    elif any(w in q for w in ['rent', 'rental', 'lease', 'tenant', 'apartment', 'property management']):
+        intent = 'renter'
+    goodbye_words = ['bye', 'goodbye', 'thank you', 'thanks', 'that is all', "that's all", 'no thanks', 'nothing else', 'have a good day']
+    return intent, any(w in q for w in goodbye_words)
+
+
+def accuracy(classify, corpus):
+    intent_ok = goodbye_ok = 0
+    misses = []
+    for row in corpus:
+        intent, goodbye = classify(row['text'])[:2]
+        intent_ok += intent == row['intent']
+        goodbye_ok += goodbye == row['goodbye']
+        if (intent, goodbye) != (row['intent'], row['goodbye']):
+            misses.append((row['text'], intent, goodbye))
+    return intent_ok / len(corpus), goodbye_ok / len(corpus), misses
+
+
+def throughput(classify, corpus, iterations):
+    texts = [row['text'] for row in corpus]
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for text in texts:
+            classify(text)
+    elapsed = time.perf_counter() - started
+    return iterations * len(texts) / elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+    classifier = CallClassifier()
+    for label, classify in (("legacy substring", legacy_classify), ("compiled classifier", classifier.classify)):
+        intent_acc, goodbye_acc, misses = accuracy(classify, corpus)
+        rate = throughput(classify, corpus, iterations)
+        print(f"{label:20s} intent={intent_acc:.1%} goodbye={goodbye_acc:.1%} "
+              f"misses={len(misses):2d} throughput={rate:,.0f} utterances/s")
+        for text, intent, goodbye in misses:
+            print(f"    miss: {text!r} -> intent={intent} goodbye={goodbye}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""Local stand-ins for Anthropic, gspread, Google Calendar and SMTP with configurable latency.
+
+install(app_module) swaps them into an imported bear_team_phone_system so the
+app can be driven end to end without touching any live service. Latencies
+come from BENCH_* environment variables (seconds).
+"""
+import os
+import smtplib
+import threading
+import time
+from datetime import datetime, timedelta
+
+
+def latency(name, default):
+    return float(os.environ.get(name, default))
+
+
+# ── Anthropic ──
+
+REPLIES = [
+    "Great, I can help with that. Can I get your name please?",
+    "Thanks! What is the best number to reach you?",
+    "Perfect. What day and time works best for a quick consultation?",
+    "You're all set, an agent will reach out before then. Anything else I can help with?",
+]
+
+
+class _Usage:
+    def __init__(self, input_tokens, output_tokens):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.cache_read_input_tokens = input_tokens - 50
+        self.cache_creation_input_tokens = 0
+
+
+class _Text:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Message:
+    def __init__(self, text, input_tokens):
+        self.content = [_Text(text)]
+        self.usage = _Usage(input_tokens, len(text.split()))
+
+
+class _Stream:
+    def __init__(self, ttft, total, text, input_tokens):
+        self.ttft = ttft
+        self.total = total
+        self.text = text
+        self.input_tokens = input_tokens
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        words = self.text.split(' ')
+        time.sleep(self.ttft)
+        step = max(0.0, self.total - self.ttft) / max(1, len(words))
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(step)
+            yield word + ' '
+
+    def get_final_message(self):
+        return _Message(self.text, self.input_tokens)
+
+
+class FakeAnthropic:
+    def __init__(self, ttft=None, total=None):
+        self.ttft = latency('BENCH_MODEL_TTFT', 0.4) if ttft is None else ttft
+        self.total = latency('BENCH_MODEL_SECONDS', 0.9) if total is None else total
+        self.calls = 0
+        self.messages = self
+
+    def stream(self, model, max_tokens, system, messages, **kwargs):
+        self.calls += 1
+        turn = sum(1 for m in messages if m['role'] == 'user')
+        text = REPLIES[min(turn, len(REPLIES)) - 1]
+        input_tokens = 1500 + sum(len(m['content']) // 4 for m in messages)
+        return _Stream(self.ttft, self.total, text, input_tokens)
+
+
+# ── Google ──
+
+class _Execute:
+    def __init__(self, fn, delay):
+        self.fn = fn
+        self.delay = delay
+
+    def execute(self):
+        time.sleep(self.delay)
+        return self.fn()
+
+
+class _Batch:
+    def __init__(self, delay, callback):
+        self.delay = delay
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id=None):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        time.sleep(self.delay)
+        for request_id, request in self.requests:
+            try:
+                self.callback(request_id, request.fn(), None)
+            except Exception as e:
+                self.callback(request_id, None, e)
+
+
+class FakeCalendar:
+    """freebusy, events().insert and batch requests. Every agent is busy 12-1 on weekdays."""
+
+    def __init__(self, delay=None):
+        self.delay = latency('BENCH_GOOGLE_SECONDS', 0.15) if delay is None else delay
+        self.events_created = {}
+        self._lock = threading.Lock()
+
+    def freebusy(self):
+        return self
+
+    def query(self, body):
+        def run():
+            start = datetime.fromisoformat(body['timeMin'])
+            busy = []
+            for day in range(14):
+                noon = (start + timedelta(days=day)).replace(hour=12, minute=0, second=0, microsecond=0)
+                busy.append({'start': noon.isoformat(), 'end': (noon + timedelta(hours=1)).isoformat()})
+            return {'calendars': {item['id']: {'busy': busy} for item in body['items']}}
+        return _Execute(run, self.delay)
+
+    def events(self):
+        return self
+
+    def insert(self, calendarId, body):
+        def run():
+            with self._lock:
+                self.events_created[body.get('id')] = body
+            return body
+        return _Execute(run, self.delay)
+
+    def new_batch_http_request(self, callback=None):
+        return _Batch(self.delay, callback)
+
+
+class FakeWorksheet:
+    def __init__(self, delay=None):
+        self.delay = latency('BENCH_GOOGLE_SECONDS', 0.15) if delay is None else delay
+        self.rows = 0
+
+    def append_rows(self, rows):
+        time.sleep(self.delay)
+        self.rows += len(rows)
+
+
+# ── SMTP ──
+
+class FakeSMTP:
+    connect_delay = 0.3
+    send_delay = 0.1
+    sent = 0
+
+    def __init__(self, host=None, port=None, timeout=None):
+        time.sleep(self.connect_delay)
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        pass
+
+    def send_message(self, msg):
+        time.sleep(self.send_delay)
+        FakeSMTP.sent += 1
+
+    def noop(self):
+        return (250, b'OK')
+
+    def quit(self):
+        pass
+
+
+def bench_environment():
+    """Settings that make the app think every integration is configured."""
+    return {
+        'ANTHROPIC_API_KEY': 'bench',
+        'TWILIO_AUTH_TOKEN': os.environ.get('TWILIO_AUTH_TOKEN', 'bench-token'),
+        'GOOGLE_SHEET_ID': 'bench-sheet',
+        'GOOGLE_CALENDAR_ID': 'bench-calendar',
+        'GMAIL_ADDRESS': 'bench@example.com',
+        'GMAIL_APP_PASSWORD': 'bench',
+        'NOTIFICATION_EMAIL': 'leads@example.com',
+    }
+
+
+def install(app_module):
+    """Point an imported bear_team_phone_system at the fakes. Returns them for inspection."""
+    FakeSMTP.connect_delay = latency('BENCH_SMTP_CONNECT_SECONDS', 0.3)
+    FakeSMTP.send_delay = latency('BENCH_SMTP_SECONDS', 0.1)
+    smtplib.SMTP = FakeSMTP
+    fakes = {'anthropic': FakeAnthropic(), 'calendar': FakeCalendar(), 'worksheet': FakeWorksheet()}
+    app_module.anthropic_client = fakes['anthropic']
+    app_module.google_clients.calendar = lambda: fakes['calendar']
+    app_module.google_clients.worksheet = lambda: fakes['worksheet']
+    app_module.sheet_writer.get_worksheet = lambda: fakes['worksheet']
+    return fakes
@@ -0,0 +1,229 @@
+"""End-to-end load test: scripted calls against run.py's waitress server with local fakes.
+
+    python benchmarks/load_test.py [--calls 200] [--concurrency 20] [--threads 4,8,16]
+
+For each waitress thread count this starts run.py in a subprocess with every
+external service replaced by benchmarks/fakes.py, drives many concurrent
+CallSids through /voice and /process_speech with signed Twilio-style form
+posts, and reports p50/p95/p99 latency per route, throughput and the
+server's peak memory. Fake latencies are set with --model-seconds,
+--google-seconds and --smtp-seconds.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+CALL_SCRIPTS = [
+    ["Hi, I'm thinking about selling my house", "My name is Dana Smith", "It's 407 555 0134",
+     "Tuesday at 2 pm works", "That's all, thank you bye"],
+    ["We're looking to buy our first home", "This is Marcus Lee", "You can reach me at 321 555 0199",
+     "How about Thursday morning at 10 am", "Thanks so much, goodbye"],
+    ["Do you have any rentals available", "Priya", "407 555 0112", "Tomorrow afternoon", "No thanks, that's all"],
+    ["What areas do you cover?", "Do you work with investors too?", "Okay thanks, bye"],
+]
+REDIRECT = re.compile(r"<Redirect[^>]*>([^<]+)</Redirect>")
+PAUSE = re.compile(r'<Pause length="(\d+)"')
+
+
+# ── Server ──
+
+def serve():
+    """Run the real run.py entry point with the fakes installed (subprocess side)."""
+    import resource
+    import run  # first, so SERVE_MODE defaults apply before the app module reads its settings
+    import bear_team_phone_system
+    import fakes
+    installed = fakes.install(bear_team_phone_system)
+
+    @bear_team_phone_system.app.route("/_bench")
+    def bench_stats():
+        return {"peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                "model_calls": installed['anthropic'].calls,
+                "events_created": len(installed['calendar'].events_created),
+                "emails_sent": fakes.FakeSMTP.sent,
+                "jobs": bear_team_phone_system.job_queue.stats()["counts"]}
+
+    run.main()
+
+
+def start_server(port, threads, args, workdir):
+    import fakes
+    env = dict(os.environ, **fakes.bench_environment())
+    env.update({
+        'PORT': str(port), 'WAITRESS_THREADS': str(threads), 'BASE_URL': f'http://127.0.0.1:{port}',
+        'PYTHONPATH': ROOT, 'SERVE_MODE': args.serve_mode,
+        'BENCH_MODEL_TTFT': str(args.model_ttft), 'BENCH_MODEL_SECONDS': str(args.model_seconds),
+        'BENCH_GOOGLE_SECONDS': str(args.google_seconds), 'BENCH_SMTP_SECONDS': str(args.smtp_seconds),
+    })
+    if args.async_turns:
+        env['ASYNC_TURNS'] = 'true'
+    log = open(os.path.join(workdir, f'server-{threads}.log'), 'w')
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve'], cwd=workdir, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"Server exited early, see {log.name}")
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/status', timeout=1).read()
+            return proc, log
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("Server did not come up within 60s")
+
+
+# ── Client ──
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(seconds)
+            self.errors += not ok
+
+
+def signed_post(base_url, path, params, validator):
+    url = base_url + path
+    data = urllib.parse.urlencode(params).encode()
+    req = urllib.request.Request(url, data=data, headers={
+        'Content-Type': 'application/x-www-form-urlencoded',
+        'X-Twilio-Signature': validator.compute_signature(url, params) if validator else ''})
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return resp.status, resp.read().decode()
+
+
+def run_call(base_url, call_number, think_seconds, validator, recorder):
+    call_sid = f"CAbench{call_number:08d}{int(time.time() * 1000) % 100000:05d}"
+    caller = f"+1407555{call_number % 10000:04d}"
+    base = {'CallSid': call_sid, 'From': caller, 'To': '+14075550000', 'AccountSid': 'ACbench'}
+    turns = [('/voice', None)] + [('/process_speech', line) for line in CALL_SCRIPTS[call_number % len(CALL_SCRIPTS)]]
+    for path, speech in turns:
+        params = dict(base, SpeechResult=speech) if speech else dict(base)
+        while path:
+            started = time.perf_counter()
+            try:
+                status, body = signed_post(base_url, path, params, validator)
+                ok = status == 200
+            except Exception:
+                body, ok = '', False
+            route = '/answer' if path.startswith('/answer/') else path
+            recorder.record(route, time.perf_counter() - started, ok)
+            # Async turns hold the caller with a redirect to /answer/<CallSid> until the reply is ready
+            redirect = REDIRECT.search(body)
+            path = None
+            if redirect and '/answer/' in redirect.group(1):
+                path = urllib.parse.urlparse(redirect.group(1)).path
+                params = dict(base)
+                pause = PAUSE.search(body)
+                if pause:
+                    time.sleep(int(pause.group(1)))  # Twilio plays the pause before following
+        if speech and '<Gather' not in body:  # the call hung up
+            break
+        if think_seconds:
+            time.sleep(think_seconds)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_load(port, args):
+    validator = None
+    try:
+        from twilio.request_validator import RequestValidator
+        validator = RequestValidator(os.environ.get('TWILIO_AUTH_TOKEN', 'bench-token'))
+    except ImportError:
+        pass
+    base_url = f'http://127.0.0.1:{port}'
+    recorder = Recorder()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        for future in [pool.submit(run_call, base_url, i, args.think_seconds, validator, recorder)
+                       for i in range(args.calls)]:
+            future.result()
+    elapsed = time.perf_counter() - started
+    requests = sum(len(v) for v in recorder.latencies.values())
+    routes = {route: {"count": len(values),
+                      "p50_ms": round(percentile(values, 50) * 1000, 1),
+                      "p95_ms": round(percentile(values, 95) * 1000, 1),
+                      "p99_ms": round(percentile(values, 99) * 1000, 1),
+                      "max_ms": round(max(values) * 1000, 1)}
+              for route, values in sorted(recorder.latencies.items())}
+    return {"elapsed_seconds": round(elapsed, 2), "requests": requests, "errors": recorder.errors,
+            "requests_per_second": round(requests / elapsed, 1), "calls_per_second": round(args.calls / elapsed, 2),
+            "routes": routes}
+
+
+def report(threads, result):
+    print(f"\n{result['serve_mode']} waitress threads={threads}  {result['requests']} requests in {result['elapsed_seconds']}s  "
+          f"{result['requests_per_second']} req/s  {result['calls_per_second']} calls/s  "
+          f"errors={result['errors']}  peak_rss={result['server'].get('peak_rss_mb')} MB")
+    print(f"    {'route':16s} {'count':>6s} {'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for route, r in result['routes'].items():
+        print(f"    {route:16s} {r['count']:6d} {r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms "
+              f"{r['p99_ms']:7.1f}ms {r['max_ms']:7.1f}ms")
+    print(f"    server: {json.dumps({k: v for k, v in result['server'].items() if k != 'peak_rss_mb'})}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--calls', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--threads', default='4,8,16', help="comma-separated waitress thread counts")
+    parser.add_argument('--port', type=int, default=18080)
+    parser.add_argument('--think-seconds', type=float, default=0.0, help="pause between caller turns")
+    parser.add_argument('--model-ttft', type=float, default=0.4)
+    parser.add_argument('--model-seconds', type=float, default=0.9)
+    parser.add_argument('--google-seconds', type=float, default=0.15)
+    parser.add_argument('--smtp-seconds', type=float, default=0.1)
+    parser.add_argument('--async-turns', action='store_true', help="run with ASYNC_TURNS=true")
+    parser.add_argument('--serve-mode', default='threaded', choices=('threaded', 'concurrent'),
+                        help="run.py SERVE_MODE")
+    parser.add_argument('--json', help="also write results to this file")
+    args = parser.parse_args()
+    if args.serve:
+        return serve()
+
+    results = {}
+    for threads in [int(t) for t in args.threads.split(',')]:
+        with tempfile.TemporaryDirectory(prefix='bear-bench-') as workdir:
+            proc, log = start_server(args.port, threads, args, workdir)
+            try:
+                result = run_load(args.port, args)
+                result['serve_mode'] = args.serve_mode
+                time.sleep(1)  # let background jobs drain before reading server stats
+                result['server'] = json.loads(urllib.request.urlopen(
+                    f'http://127.0.0.1:{args.port}/_bench', timeout=5).read())
+            finally:
+                proc.terminate()
+                proc.wait(10)
+                log.close()
+        results[threads] = result
+        report(threads, result)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
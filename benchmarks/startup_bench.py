@@ -0,0 +1,58 @@
+"""Cold start: time from process start to the first served /voice response.
+
+    python benchmarks/startup_bench.py [runs]
+
+Starts run.py fresh each run and polls /voice until it answers. The "eager"
+row imports anthropic, gspread, googleapiclient and twilio.rest before
+run.py, the way the app used to at module load, for comparison.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+PORT = 18090
+EAGER_IMPORTS = "import anthropic, gspread, googleapiclient.discovery, google.oauth2.service_account, twilio.rest; "
+
+
+def first_voice_seconds(eager, workdir):
+    env = dict(os.environ, PORT=str(PORT), PYTHONPATH=ROOT, ANTHROPIC_API_KEY='bench', TWILIO_ACCOUNT_SID='',
+               GOOGLE_SHEET_ID='', GOOGLE_CALENDAR_ID='', BASE_URL=f'http://127.0.0.1:{PORT}')
+    code = (EAGER_IMPORTS if eager else "") + f"import runpy; runpy.run_path({os.path.join(ROOT, 'run.py')!r}, run_name='__main__')"
+    data = urllib.parse.urlencode({'CallSid': 'CAstartup', 'From': '+14075550100'}).encode()
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', code], cwd=workdir, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - started < 60:
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{PORT}/voice', data=data, timeout=5).read()
+                return time.perf_counter() - started
+            except OSError:
+                if proc.poll() is not None:
+                    raise RuntimeError("run.py exited before serving /voice")
+                time.sleep(0.005)
+        raise RuntimeError("No /voice response within 60s")
+    finally:
+        proc.terminate()
+        proc.wait(10)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    for label, eager in (("lazy (current)", False), ("eager imports", True)):
+        times = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory(prefix='bear-startup-') as workdir:
+                times.append(first_voice_seconds(eager, workdir))
+        print(f"{label:16s} first /voice after median={statistics.median(times) * 1000:.0f}ms "
+              f"min={min(times) * 1000:.0f}ms max={max(times) * 1000:.0f}ms ({runs} runs)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""Accuracy and parse time of time_parser.parse_time vs the old parse_requested_time.
+
+    python benchmarks/time_parser_bench.py [iterations]
+"""
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from time_parser import parse_time
+
+CORPUS = os.path.join(os.path.dirname(__file__), 'time_corpus.json')
+EASTERN = pytz.timezone('America/New_York')
+
+
+def legacy_parse(caller_questions, now):
+    # parse_requested_time as it was, with "now" passed in so runs are repeatable
+    recent_text = " ".join(caller_questions[-4:]).lower()
+    target_date = None
+    day_map = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+               'friday': 4, 'saturday': 5, 'sunday': 6}
+    if 'today' in recent_text:
+        target_date = now.date()
+    elif 'tomorrow' in recent_text:
+        target_date = (now + timedelta(days=1)).date()
+    else:
+        for day_name, day_num in day_map.items():
+            if day_name in recent_text:
+                days_ahead = (day_num - now.weekday()) % 7
+                if days_ahead == 0:
+                    days_ahead = 7
+                target_date = (now + timedelta(days=days_ahead)).date()
+                break
+    if not target_date:
+        return None
+    target_hour, target_minute = 10, 0
+    time_match = re.search(r'(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)', recent_text)
+    if not time_match:
+        time_match = re.search(r'(?:at\s+)(\d{1,2})(?::(\d{2}))?(?:\s*o.?clock)?', recent_text)
+    if not time_match:
+        day_names = '|'.join(day_map.keys())
+        time_match = re.search(r'(?:' + day_names + r')\s+(?:at\s+)?(\d{1,2})(?::(\d{2}))?\s*(am|pm|a\.m\.|p\.m\.)?', recent_text)
+    if time_match:
+        hour = int(time_match.group(1))
+        minute = int(time_match.group(2)) if time_match.group(2) else 0
+        ampm = time_match.group(3) if time_match.lastindex >= 3 else None
+        if ampm and ('pm' in ampm or 'p.m' in ampm):
+            if hour != 12:
+                hour += 12
+        elif ampm and ('am' in ampm or 'a.m' in ampm):
+            if hour == 12:
+                hour = 0
+        else:
+            if 1 <= hour <= 6:
+                hour += 12
+        target_hour, target_minute = hour, minute
+    try:
+        return EASTERN.localize(datetime(target_date.year, target_date.month, target_date.day, target_hour, target_minute))
+    except Exception:
+        return None
+
+
+def new_parse(caller_questions, now):
+    parsed = parse_time(caller_questions, EASTERN, now=now)
+    return parsed.slot if parsed else None
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    with open(CORPUS) as f:
+        corpus = json.load(f)
+    cases = []
+    for row in corpus:
+        now = EASTERN.localize(datetime.strptime(row['now'], '%Y-%m-%d %H:%M'))
+        expected = EASTERN.localize(datetime.strptime(row['expected'], '%Y-%m-%d %H:%M')) if row['expected'] else None
+        cases.append((row['utterances'], now, expected))
+    for label, parse in (("legacy parse_requested_time", legacy_parse), ("time_parser.parse_time", new_parse)):
+        correct = 0
+        misses = []
+        for utterances, now, expected in cases:
+            got = parse(utterances, now)
+            if got == expected:
+                correct += 1
+            else:
+                misses.append((utterances, got, expected))
+        started = time.perf_counter()
+        for _ in range(iterations):
+            for utterances, now, _ in cases:
+                parse(utterances, now)
+        per_call = (time.perf_counter() - started) / (iterations * len(cases)) * 1e6
+        print(f"{label:28s} accuracy={correct / len(cases):.1%} ({correct}/{len(cases)}) parse={per_call:.1f}us/call")
+        for utterances, got, expected in misses:
+            print(f"    miss: {utterances} -> {got and got.strftime('%a %m-%d %H:%M')} "
+                  f"(expected {expected and expected.strftime('%a %m-%d %H:%M')})")
+
+
+if __name__ == '__main__':
+    main()
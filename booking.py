@@ -0,0 +1,159 @@
+import base64
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+# ── Idempotent Booking ──
+# Every booking is keyed by CallSid. The ledger remembers what was booked and
+# the Calendar event id is derived from the CallSid, so a retried webhook or a
+# re-run job can never create a second event — Calendar rejects the duplicate
+# id with 409 and we treat that as already booked. A slot is booked exactly as
+# the caller agreed to it; if it was taken in the meantime the booking fails
+# with SlotTaken rather than quietly moving to another time.
+
+
+def event_id_for(key):
+    """Deterministic Calendar event id (base32hex, lowercase) for a booking key."""
+    digest = hashlib.sha1(key.encode('utf-8')).digest()
+    return base64.b32hexencode(digest).decode('ascii').lower().rstrip('=')
+
+
+class SlotTaken(Exception):
+    def __init__(self, calendar_id, slot):
+        super().__init__(f"{slot.isoformat()} is no longer free on {calendar_id}")
+        self.calendar_id = calendar_id
+        self.slot = slot
+
+
+def is_duplicate_error(error):
+    return getattr(getattr(error, 'resp', None), 'status', None) == 409
+
+
+class BookingLedger:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS bookings (
+            call_sid TEXT PRIMARY KEY,
+            event_id TEXT NOT NULL,
+            calendar_id TEXT NOT NULL,
+            slot TEXT NOT NULL,
+            status TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL
+        )""")
+
+    def get(self, call_sid):
+        with self._lock:
+            row = self._db.execute("SELECT event_id, calendar_id, slot, status FROM bookings WHERE call_sid = ?",
+                                   (call_sid,)).fetchone()
+        return dict(zip(('event_id', 'calendar_id', 'slot', 'status'), row)) if row else None
+
+    def reserve(self, call_sid, event_id, calendar_id, slot):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO bookings (call_sid, event_id, calendar_id, slot, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?) "
+                "ON CONFLICT(call_sid) DO UPDATE SET calendar_id = excluded.calendar_id, slot = excluded.slot, "
+                "updated_at = excluded.updated_at WHERE status != 'booked'",
+                (call_sid, event_id, calendar_id, slot.isoformat(), now, now))
+
+    def mark_booked(self, call_sid):
+        with self._lock:
+            self._db.execute("UPDATE bookings SET status = 'booked', updated_at = ? WHERE call_sid = ?",
+                             (time.time(), call_sid))
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM bookings GROUP BY status").fetchall()
+        return dict(rows)
+
+
+class Booker:
+    def __init__(self, ledger, get_service, availability=None):
+        self.ledger = ledger
+        self.get_service = get_service
+        self.availability = availability
+
+    def resolve_slot(self, calendar_id, slot):
+        """The requested slot if it's in business hours and free, else the nearest free one (or None)."""
+        if not self.availability:
+            return slot
+        if self.availability.in_business_hours(slot) and self.availability.is_free(calendar_id, slot):
+            return slot
+        return self.availability.nearest_free(calendar_id, slot)
+
+    def _prepare(self, call_sid, calendar_id, slot, make_event):
+        existing = self.ledger.get(call_sid)
+        if existing and existing['status'] == 'booked':
+            return None, existing
+        if self.availability and not (self.availability.in_business_hours(slot)
+                                      and self.availability.is_free(calendar_id, slot)):
+            raise SlotTaken(calendar_id, slot)
+        event_id = existing['event_id'] if existing else event_id_for(call_sid)
+        self.ledger.reserve(call_sid, event_id, calendar_id, slot)
+        event = dict(make_event(slot), id=event_id)
+        return (slot, event), None
+
+    def _booked(self, call_sid, calendar_id, slot, event):
+        self.ledger.mark_booked(call_sid)
+        if self.availability:
+            self.availability.mark_busy(calendar_id, slot, slot + self.availability.slot)
+
+    def book(self, call_sid, calendar_id, slot, make_event):
+        """Book once per call_sid. Returns (slot, created). Raises SlotTaken if the slot is no longer free,
+        or whatever Calendar raised."""
+        prepared, existing = self._prepare(call_sid, calendar_id, slot, make_event)
+        if existing:
+            return datetime.fromisoformat(existing['slot']), False
+        resolved, event = prepared
+        try:
+            self.get_service().events().insert(calendarId=calendar_id, body=event).execute()
+        except Exception as e:
+            if not is_duplicate_error(e):
+                raise
+        self._booked(call_sid, calendar_id, resolved, event)
+        return resolved, True
+
+    def book_many(self, requests):
+        """Book several (call_sid, calendar_id, slot, make_event) requests in one Calendar batch.
+        Returns {call_sid: error or None}."""
+        service = self.get_service()
+        results = {}
+        prepared = {}
+        taken = set()
+
+        def on_response(request_id, response, exception):
+            if exception is not None and not is_duplicate_error(exception):
+                results[request_id] = exception
+                return
+            calendar_id, resolved, event = prepared[request_id]
+            self._booked(request_id, calendar_id, resolved, event)
+            results[request_id] = None
+
+        batch = service.new_batch_http_request(callback=on_response)
+        for call_sid, calendar_id, slot, make_event in requests:
+            if call_sid in results or call_sid in prepared:
+                continue  # Same call queued twice — one insert covers both
+            try:
+                if (calendar_id, slot) in taken:
+                    raise SlotTaken(calendar_id, slot)  # Another call in this batch agreed to it too
+                ready, existing = self._prepare(call_sid, calendar_id, slot, make_event)
+            except Exception as e:
+                results[call_sid] = e
+                continue
+            if existing:
+                results[call_sid] = None
+                continue
+            resolved, event = ready
+            taken.add((calendar_id, resolved))
+            prepared[call_sid] = (calendar_id, resolved, event)
+            batch.add(service.events().insert(calendarId=calendar_id, body=event), request_id=call_sid)
+        if prepared:
+            batch.execute()
+        return results
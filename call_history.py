@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+
+# ── Call History ──
+# Every call is saved locally with what we learned (intent, agent, name,
+# callback number, booked slot), indexed by caller phone and time, so /voice
+# can recognise a returning caller with one index lookup instead of asking
+# the Google Sheet.
+
+FIELDS = ('call_sid', 'tenant', 'caller_phone', 'called_at', 'intent', 'agent_key', 'caller_name', 'callback_number',
+          'booked_slot', 'turns')
+
+
+class CallHistory:
+    def __init__(self, path, lookback_days=90):
+        self.path = path
+        self.lookback_days = lookback_days
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_seconds = 0.0
+        db = self._db()
+        db.execute("""CREATE TABLE IF NOT EXISTS calls (
+            call_sid TEXT PRIMARY KEY,
+            tenant TEXT NOT NULL DEFAULT 'default',
+            caller_phone TEXT NOT NULL,
+            called_at REAL NOT NULL,
+            intent TEXT,
+            agent_key TEXT,
+            caller_name TEXT,
+            callback_number TEXT,
+            booked_slot TEXT,
+            turns INTEGER NOT NULL DEFAULT 0
+        )""")
+        if 'tenant' not in [row[1] for row in db.execute("PRAGMA table_info(calls)")]:
+            # History files from before multi-tenant mode belong to the default tenant
+            db.execute("ALTER TABLE calls ADD COLUMN tenant TEXT NOT NULL DEFAULT 'default'")
+        db.execute("CREATE INDEX IF NOT EXISTS calls_caller_phone_called_at ON calls (caller_phone, called_at)")
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def record(self, call_sid, caller_phone, intent=None, agent_key=None, caller_name=None, callback_number=None,
+               booked_slot=None, turns=0, tenant='default'):
+        """Save (or update) this call. Safe to call after every turn — earlier facts are kept."""
+        self._db().execute(
+            "INSERT INTO calls (call_sid, tenant, caller_phone, called_at, intent, agent_key, caller_name, "
+            "callback_number, booked_slot, turns) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(call_sid) DO UPDATE SET "
+            "intent = COALESCE(excluded.intent, intent), agent_key = COALESCE(excluded.agent_key, agent_key), "
+            "caller_name = COALESCE(excluded.caller_name, caller_name), "
+            "callback_number = COALESCE(excluded.callback_number, callback_number), "
+            "booked_slot = COALESCE(excluded.booked_slot, booked_slot), turns = excluded.turns",
+            (call_sid, tenant, caller_phone, time.time(), intent, agent_key, caller_name, callback_number, booked_slot,
+             turns))
+
+    def last_call(self, caller_phone, exclude_call_sid=None, tenant='default'):
+        """The most recent earlier call from this number to this tenant within the lookback window, or None."""
+        started = time.perf_counter()
+        row = self._db().execute(
+            "SELECT " + ", ".join(FIELDS) + " FROM calls WHERE caller_phone = ? AND tenant = ? AND called_at >= ? "
+            "AND call_sid != ? ORDER BY called_at DESC LIMIT 1",
+            (caller_phone, tenant, time.time() - self.lookback_days * 86400, exclude_call_sid or '')).fetchone()
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self.lookups += 1
+            self.hits += row is not None
+            self.lookup_seconds += elapsed
+        return dict(zip(FIELDS, row)) if row else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "returning_callers": self.hits,
+                "avg_lookup_us": round(self.lookup_seconds / self.lookups * 1e6, 1) if self.lookups else None
+            }
@@ -0,0 +1,150 @@
+import csv
+import io
+import json
+import sqlite3
+import threading
+
+# ── Call Log ──
+# Every logged call (lead or voicemail) is appended to a local SQLite table
+# next to the Google Sheet row, so reporting never has to read the sheet.
+# Daily totals are bumped in the same transaction as the insert, which makes
+# /report a small indexed read however long the log gets. Exports stream rows
+# from a cursor in pages, so memory stays flat for any date range.
+
+COLUMNS = ('logged_at', 'tenant', 'call_sid', 'caller_phone', 'call_type', 'intent', 'agent', 'booked_slot',
+           'requested_slot', 'conversation', 'voicemail')
+PAGE_SIZE = 500
+
+
+def daily_metrics(call_type, intent, agent, booked_slot):
+    """The counters one log row adds to its day."""
+    metrics = ['calls', 'intent:' + (intent or 'general')]
+    if call_type == 'Voicemail':
+        metrics.append('voicemails')
+    if booked_slot:
+        metrics.append('bookings')
+    if agent:
+        metrics.append('agent:' + agent)
+    return metrics
+
+
+class CallLog:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        db = self._db()
+        db.execute("""CREATE TABLE IF NOT EXISTS call_log (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            logged_at TEXT NOT NULL,
+            day TEXT NOT NULL,
+            tenant TEXT NOT NULL,
+            call_sid TEXT,
+            caller_phone TEXT NOT NULL,
+            call_type TEXT NOT NULL,
+            intent TEXT,
+            agent TEXT,
+            booked_slot TEXT,
+            requested_slot TEXT,
+            conversation TEXT,
+            voicemail TEXT,
+            UNIQUE (call_sid, call_type)
+        )""")
+        db.execute("CREATE INDEX IF NOT EXISTS call_log_day ON call_log (day)")
+        db.execute("""CREATE TABLE IF NOT EXISTS daily_stats (
+            day TEXT NOT NULL,
+            tenant TEXT NOT NULL,
+            metric TEXT NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (day, tenant, metric)
+        )""")
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def _db(self):
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = self._local.db = self._connect()
+        return db
+
+    def append(self, logged_at, tenant, call_sid, caller_phone, call_type, intent=None, agent=None, booked_slot=None,
+               requested_slot=None, conversation='', voicemail=''):
+        """Add one row and bump its day's totals. A retried job for the same call and type is ignored."""
+        db = self._db()
+        day = logged_at[:10]
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            cur = db.execute(
+                "INSERT OR IGNORE INTO call_log (logged_at, day, tenant, call_sid, caller_phone, call_type, intent, "
+                "agent, booked_slot, requested_slot, conversation, voicemail) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (logged_at, day, tenant, call_sid, caller_phone, call_type, intent, agent or None, booked_slot,
+                 requested_slot, conversation, voicemail))
+            if cur.rowcount:
+                db.executemany(
+                    "INSERT INTO daily_stats (day, tenant, metric, value) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT(day, tenant, metric) DO UPDATE SET value = value + 1",
+                    [(day, tenant, metric) for metric in daily_metrics(call_type, intent, agent, booked_slot)])
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return bool(cur.rowcount)
+
+    def _where(self, start=None, end=None, intent=None, agent=None, tenant=None):
+        clauses, params = [], []
+        for clause, value in (("day >= ?", start), ("day <= ?", end), ("intent = ?", intent), ("agent = ?", agent),
+                              ("tenant = ?", tenant)):
+            if value:
+                clauses.append(clause)
+                params.append(value)
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def rows(self, **filters):
+        """Matching rows as dicts, oldest first, read a page at a time on a connection of their own."""
+        where, params = self._where(**filters)
+        db = self._connect()  # A long export never holds a read transaction on the thread's shared connection
+        try:
+            cur = db.execute("SELECT " + ", ".join(COLUMNS) + " FROM call_log" + where + " ORDER BY id", params)
+            while True:
+                page = cur.fetchmany(PAGE_SIZE)
+                if not page:
+                    return
+                for row in page:
+                    yield dict(zip(COLUMNS, row))
+        finally:
+            db.close()
+
+    def export_csv(self, **filters):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(COLUMNS)
+        for row in self.rows(**filters):
+            writer.writerow([row[c] for c in COLUMNS])
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    def export_ndjson(self, **filters):
+        chunk = []
+        for row in self.rows(**filters):
+            chunk.append(json.dumps(row) + "\n")
+            if len(chunk) == PAGE_SIZE:
+                yield "".join(chunk)
+                chunk = []
+        yield "".join(chunk)
+
+    def report(self, start=None, end=None, tenant=None):
+        """{day: {metric: count}} from the precomputed daily totals."""
+        where, params = self._where(start=start, end=end, tenant=tenant)
+        days = {}
+        for day, metric, value in self._db().execute(
+                "SELECT day, metric, SUM(value) FROM daily_stats" + where + " GROUP BY day, metric ORDER BY day",
+                params):
+            days.setdefault(day, {})[metric] = value
+        return days
@@ -0,0 +1,99 @@
+import re
+
+# ── Keyword Classifier ──
+# Every keyword set (intents, goodbye, anything added later) is compiled into
+# one word-boundary regex, so each utterance is scanned once no matter how
+# many categories there are. "list" no longer matches "listen".
+
+INTENT_KEYWORDS = {
+    'buyer': ['buy', 'buying', 'buyer', 'purchase', 'purchasing', 'looking for a home', 'looking for a house',
+              'find a house', 'find a home', 'first time home', 'first-time home', 'pre-approved', 'pre approved'],
+    'seller': ['sell', 'selling', 'seller', 'sold', 'list', 'listing', 'list my home', 'list my house',
+               'value my home', 'what is my home worth', "what's my home worth", 'home valuation', 'market analysis'],
+    'renter': ['rent', 'renting', 'rental', 'rentals', 'lease', 'leasing', 'tenant', 'tenants', 'apartment',
+               'apartments', 'property management', 'property manager'],
+}
+
+GOODBYE_PHRASES = ['bye', 'goodbye', 'good bye', 'bye bye', 'thank you', 'thanks', 'that is all', "that's all",
+                   'no thanks', 'no thank you', 'nothing else', 'have a good day', 'have a great day', 'have a nice day']
+
+# Words that can trail a goodbye without meaning the caller kept talking
+CLOSING_WORDS = {'so', 'much', 'very', 'you', 'too', 'again', 'bye', 'goodbye', 'for', 'your', 'the', 'help', 'all',
+                 'that', 'is', "that's", 'im', "i'm", 'good', 'fine', 'ok', 'okay', 'great', 'day', 'have', 'a',
+                 'nice', 'thanks', 'thank', 'calling', 'everything', 'appreciate', 'it', 'alright', 'then', 'and'}
+WORD = re.compile(r"[a-z']+")
+
+
+def trie_pattern(phrases):
+    """Regex for a set of phrases, factored by shared prefixes so the engine
+    never retries the same leading characters across alternatives."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[''] = True
+
+    def build(node):
+        alternatives = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch != '']
+        if not alternatives:
+            return ''
+        body = alternatives[0] if len(alternatives) == 1 else '(?:' + '|'.join(alternatives) + ')'
+        # Greedy optional tail: longest phrase wins, shorter ones on backtrack
+        return '(?:' + body + ')?' if '' in node else body
+
+    return build(trie)
+
+
+class KeywordClassifier:
+    def __init__(self, categories):
+        """categories maps a name to its keyword phrases, in priority order."""
+        self.categories = list(categories)
+        self._phrase_categories = {}
+        for name, phrases in categories.items():
+            for phrase in phrases:
+                self._phrase_categories.setdefault(phrase.lower(), []).append(name)
+        self._pattern = re.compile(r"(?<![\w'])(?:" + trie_pattern(self._phrase_categories) + r")(?![\w'])",
+                                   re.IGNORECASE)
+
+    def matches(self, text):
+        """All keyword hits in one pass, as (category, phrase, start, end) tuples."""
+        found = []
+        for m in self._pattern.finditer(text):
+            phrase = m.group(0).lower()
+            for name in self._phrase_categories[phrase]:
+                found.append((name, phrase, m.start(), m.end()))
+        return found
+
+    def categories_in(self, text):
+        hits = {name for name, _, _, _ in self.matches(text)}
+        return [name for name in self.categories if name in hits]
+
+
+class CallClassifier:
+    def __init__(self, intent_keywords=None, goodbye_phrases=None):
+        intent_keywords = intent_keywords or INTENT_KEYWORDS
+        self.intents = list(intent_keywords)
+        self.keywords = KeywordClassifier(dict(intent_keywords, goodbye=goodbye_phrases or GOODBYE_PHRASES))
+
+    def classify(self, text):
+        """Returns (intent or None, is_goodbye, matches) from a single scan."""
+        matches = self.keywords.matches(text)
+        hit = {name for name, _, _, _ in matches}
+        intent = next((name for name in self.intents if name in hit), None)
+        return intent, self._is_goodbye(text, matches), matches
+
+    def intent(self, text):
+        return self.classify(text)[0]
+
+    def is_goodbye(self, text):
+        return self.classify(text)[1]
+
+    def _is_goodbye(self, text, matches):
+        goodbye_ends = [end for name, _, _, end in matches if name == 'goodbye']
+        if not goodbye_ends:
+            return False
+        # Only a goodbye at the end of what they said counts — "thanks, I also
+        # wanted to ask about rentals" keeps the call going
+        tail = WORD.findall(text[max(goodbye_ends):].lower())
+        return all(word in CLOSING_WORDS for word in tail)
@@ -0,0 +1,179 @@
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# ── Conversation Stores ──
+# Call state keyed by CallSid with LRU + TTL eviction. Both stores expose the
+# same get / save / get_or_create / stats interface, so the backend can be
+# switched with CONVERSATION_STORE. The SQLite store keeps call state off the
+# heap and across a restart of the process; it does not make the app safe to
+# run as several processes, because pending async turns, webhook
+# deduplication and speculative prefetch live in process memory. Run one
+# process and scale with threads (SERVE_MODE=concurrent).
+
+
+def approx_size(conversation):
+    size = sys.getsizeof(conversation)
+    for name in getattr(conversation, '__slots__', ()):
+        value = getattr(conversation, name, None)
+        size += sys.getsizeof(value)
+        if isinstance(value, list):
+            for item in value:
+                size += sys.getsizeof(item)
+                if isinstance(item, dict):
+                    size += sum(sys.getsizeof(v) for v in item.values())
+    return size
+
+
+class MemoryConversationStore:
+    def __init__(self, max_entries=5000, ttl_seconds=1800):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()  # call_sid -> (conversation, last_touched)
+        self._lock = threading.Lock()
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    def _evict(self, now):
+        # Oldest entries sit at the front, so stop at the first one still fresh
+        while self._items:
+            call_sid, (_, touched) = next(iter(self._items.items()))
+            if now - touched < self.ttl_seconds:
+                break
+            del self._items[call_sid]
+            self.evicted_ttl += 1
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+            self.evicted_lru += 1
+
+    def get(self, call_sid):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self._items.get(call_sid)
+            if entry is None:
+                return None
+            self._items[call_sid] = (entry[0], now)
+            self._items.move_to_end(call_sid)
+            return entry[0]
+
+    def save(self, call_sid, conversation):
+        now = time.time()
+        with self._lock:
+            self._items[call_sid] = (conversation, now)
+            self._items.move_to_end(call_sid)
+            self._evict(now)
+
+    def get_or_create(self, call_sid, factory):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            entry = self._items.get(call_sid)
+            conversation = entry[0] if entry else factory()
+            self._items[call_sid] = (conversation, now)
+            self._items.move_to_end(call_sid)
+            return conversation
+
+    def __contains__(self, call_sid):
+        return self.get(call_sid) is not None
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        with self._lock:
+            self._evict(time.time())
+            conversations = [c for c, _ in self._items.values()]
+        return {
+            "backend": "memory",
+            "entries": len(conversations),
+            "approx_bytes": sum(approx_size(c) for c in conversations),
+            "evicted_ttl": self.evicted_ttl,
+            "evicted_lru": self.evicted_lru
+        }
+
+
+class SQLiteConversationStore:
+    def __init__(self, path, max_entries=50000, ttl_seconds=1800):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._local = threading.local()
+        self._writes = 0
+        self.evicted = 0
+        db = self._db()
+        db.execute("""CREATE TABLE IF NOT EXISTS conversations (
+            call_sid TEXT PRIMARY KEY,
+            data BLOB NOT NULL,
+            updated_at REAL NOT NULL
+        )""")
+        db.execute("CREATE INDEX IF NOT EXISTS conversations_updated_at ON conversations (updated_at)")
+
+    def _db(self):
+        # One connection per thread; WAL lets other processes read while we write
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _evict(self, db, now):
+        cur = db.execute("DELETE FROM conversations WHERE updated_at < ?", (now - self.ttl_seconds,))
+        self.evicted += cur.rowcount
+        cur = db.execute("""DELETE FROM conversations WHERE call_sid IN (
+            SELECT call_sid FROM conversations ORDER BY updated_at DESC LIMIT -1 OFFSET ?)""", (self.max_entries,))
+        self.evicted += cur.rowcount
+
+    def get(self, call_sid):
+        row = self._db().execute("SELECT data, updated_at FROM conversations WHERE call_sid = ?", (call_sid,)).fetchone()
+        if not row or time.time() - row[1] >= self.ttl_seconds:
+            return None
+        return pickle.loads(row[0])
+
+    def save(self, call_sid, conversation):
+        now = time.time()
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO conversations (call_sid, data, updated_at) VALUES (?, ?, ?)",
+                   (call_sid, pickle.dumps(conversation), now))
+        self._writes += 1
+        if self._writes % 100 == 0:
+            self._evict(db, now)
+
+    def get_or_create(self, call_sid, factory):
+        conversation = self.get(call_sid)
+        if conversation is None:
+            conversation = factory()
+            self.save(call_sid, conversation)
+        return conversation
+
+    def __contains__(self, call_sid):
+        return self.get(call_sid) is not None
+
+    def __len__(self):
+        cutoff = time.time() - self.ttl_seconds
+        return self._db().execute("SELECT COUNT(*) FROM conversations WHERE updated_at >= ?", (cutoff,)).fetchone()[0]
+
+    def stats(self):
+        cutoff = time.time() - self.ttl_seconds
+        entries, data_bytes = self._db().execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM conversations WHERE updated_at >= ?",
+            (cutoff,)).fetchone()
+        return {
+            "backend": "sqlite",
+            "entries": entries,
+            "approx_bytes": data_bytes,
+            "db_bytes": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "evicted": self.evicted
+        }
+
+
+def create_store(backend='memory', path='conversations.db', max_entries=5000, ttl_seconds=1800):
+    if backend == 'sqlite':
+        return SQLiteConversationStore(path, max_entries=max_entries, ttl_seconds=ttl_seconds)
+    return MemoryConversationStore(max_entries=max_entries, ttl_seconds=ttl_seconds)
@@ -0,0 +1,97 @@
+import json
+import threading
+
+# ── Shared Google Clients ──
+# Credentials, the gspread client, the opened worksheet and the Calendar
+# service are created once and reused for the life of the process. The Google
+# libraries are imported on first use so they don't slow down startup.
+
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/calendar']
+SHEET_HEADER = ['Date', 'Time', 'Caller Phone', 'Call Type', 'Intent', 'Assigned Agent', 'Conversation', 'Voicemail']
+
+
+class GoogleClients:
+    def __init__(self, credentials_json=None, credentials_file='credentials.json', sheet_id=None):
+        self.credentials_json = credentials_json
+        self.credentials_file = credentials_file
+        self.sheet_id = sheet_id
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._creds = None
+        self._gspread = None
+        self._worksheet = None
+        self._calendar_doc = None
+
+    def credentials(self):
+        from google.auth.transport.requests import Request
+        from google.oauth2.service_account import Credentials
+        with self._lock:
+            if self._creds is None:
+                if self.credentials_json:
+                    info = json.loads(self.credentials_json)
+                    if 'private_key' in info:
+                        info['private_key'] = info['private_key'].replace('\\n', '\n')
+                    self._creds = Credentials.from_service_account_info(info, scopes=SCOPES)
+                else:
+                    self._creds = Credentials.from_service_account_file(self.credentials_file, scopes=SCOPES)
+            if not self._creds.valid:
+                self._creds.refresh(Request())
+            return self._creds
+
+    def sheets(self):
+        with self._lock:
+            if self._gspread is None:
+                import gspread
+                self._gspread = gspread.authorize(self.credentials())
+            return self._gspread
+
+    def worksheet(self):
+        """The call log worksheet, opened once with its header row checked on first use."""
+        with self._lock:
+            if self._worksheet is None:
+                sheet = self.sheets().open_by_key(self.sheet_id).sheet1
+                if sheet.row_count == 0 or sheet.cell(1, 1).value != 'Date':
+                    sheet.insert_row(SHEET_HEADER, 1)
+                self._worksheet = sheet
+            return self._worksheet
+
+    def calendar(self):
+        # httplib2 connections are not thread-safe, so each waitress/worker
+        # thread builds its own service once and keeps it
+        service = getattr(self._local, 'calendar', None)
+        if service is None:
+            from googleapiclient.discovery import build, build_from_document
+            doc = self.calendar_discovery_doc()
+            if doc:
+                service = build_from_document(doc, credentials=self.credentials())
+            else:
+                service = build('calendar', 'v3', credentials=self.credentials(), cache_discovery=False)
+            self._local.calendar = service
+        else:
+            self.credentials()
+        return service
+
+    def calendar_discovery_doc(self):
+        """The Calendar v3 discovery document shipped with google-api-python-client, read once."""
+        with self._lock:
+            if self._calendar_doc is None:
+                try:
+                    from googleapiclient.discovery_cache import get_static_doc
+                    self._calendar_doc = get_static_doc('calendar', 'v3') or ''
+                except ImportError:
+                    self._calendar_doc = ''  # Older client library — build() fetches it instead
+            return self._calendar_doc
+
+    def warm_up(self):
+        """Import the client libraries and load credentials ahead of the first call that needs them."""
+        import gspread  # noqa: F401
+        self.calendar_discovery_doc()
+        self.credentials()
+
+    def reset(self):
+        """Drop cached handles so the next call reconnects (e.g. after the sheet was replaced)."""
+        with self._lock:
+            self._gspread = None
+            self._worksheet = None
+            self._creds = None
+        self._local = threading.local()
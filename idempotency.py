@@ -0,0 +1,83 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ── Webhook Deduplication ──
+# Twilio retries a webhook that is slow to answer. The first request for a key
+# runs the handler and stores its response; a repeat of the same key replays
+# that response instead of re-running the turn, and a repeat that arrives
+# while the first is still running waits for it. Entries expire after
+# ttl_seconds and the cache holds at most max_entries keys.
+
+
+class _Entry:
+    __slots__ = ('done', 'result', 'stored_at')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.stored_at = None
+
+
+class WebhookDeduplicator:
+    def __init__(self, max_entries=10000, ttl_seconds=300, wait_seconds=20):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.replayed = 0
+        self.waited = 0
+
+    def run(self, key, fn):
+        """fn() once per key. Returns (result, replayed); repeats get the stored result.
+        Raises TimeoutError if the first run is still going after wait_seconds."""
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                expired = entry is not None and entry.stored_at is not None and \
+                    time.time() - entry.stored_at >= self.ttl_seconds
+                if expired:
+                    del self._entries[key]
+                    entry = None
+                if entry is None:
+                    entry = self._entries[key] = _Entry()
+                    while len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    owner = True
+                else:
+                    self._entries.move_to_end(key)
+                    owner = False
+            if owner:
+                break
+            if not entry.done.is_set():
+                with self._lock:
+                    self.waited += 1
+                if not entry.done.wait(self.wait_seconds):
+                    raise TimeoutError(f"Still handling the first request for {key}")
+            if entry.stored_at is not None:
+                with self._lock:
+                    self.replayed += 1
+                return entry.result, True
+            # The first run failed — this repeat gets to try again
+
+        with self._lock:
+            self.runs += 1
+        try:
+            result = fn()
+        except Exception:
+            with self._lock:
+                if self._entries.get(key) is entry:
+                    del self._entries[key]
+            entry.done.set()
+            raise
+        entry.result = result
+        entry.stored_at = time.time()
+        entry.done.set()
+        return result, False
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "runs": self.runs, "replayed": self.replayed,
+                    "waited": self.waited}
@@ -0,0 +1,194 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+
+# ── Durable Background Job Queue ──
+# Jobs are stored in SQLite so anything still pending when the process
+# restarts gets picked up again. Failed jobs are retried with exponential
+# backoff until max_attempts is reached. Claims happen inside one write
+# transaction and only take rows that are still pending, so several
+# processes can share the file without running a job twice; a job left
+# 'running' longer than stale_seconds is assumed to belong to a dead worker
+# and is requeued.
+
+
+class JobQueue:
+    def __init__(self, path, workers=3, max_attempts=5, base_delay=2.0, max_delay=300.0, keep_done_hours=24,
+                 stale_seconds=900):
+        self.path = path
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.keep_done_hours = keep_done_hours
+        self.stale_seconds = stale_seconds
+        self.handlers = {}
+        self.batch_sizes = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            run_at REAL NOT NULL,
+            created_at REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            last_error TEXT
+        )""")
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status_run_at ON jobs (status, run_at)")
+        self._requeue_stale(time.time())
+
+    def handler(self, name, batch_size=1):
+        """Register fn(**payload). With batch_size > 1, fn(payloads) gets up to that many
+        due jobs at once and returns one error (or None) per payload."""
+        def register(fn):
+            self.handlers[name] = fn
+            self.batch_sizes[name] = batch_size
+            return fn
+        return register
+
+    def enqueue(self, name, delay=0, **payload):
+        """Store a job to run after `delay` seconds. Returns its id."""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, name, payload, status, run_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, 'pending', ?, ?, ?)",
+                (job_id, name, json.dumps(payload), now + delay, now, now))
+        self._wake.set()
+        return job_id
+
+    def start(self):
+        if self._threads:
+            return
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def depth(self, name=None):
+        with self._lock:
+            if name is None:
+                row = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running')").fetchone()
+            else:
+                row = self._db.execute("SELECT COUNT(*) FROM jobs WHERE status IN ('pending', 'running') AND name = ?",
+                                       (name,)).fetchone()
+        return row[0]
+
+    def status(self, job_id):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, name, status, attempts, run_at, created_at, updated_at, last_error FROM jobs WHERE id = ?",
+                (job_id,)).fetchone()
+        if not row:
+            return None
+        keys = ('id', 'name', 'status', 'attempts', 'run_at', 'created_at', 'updated_at', 'last_error')
+        return dict(zip(keys, row))
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+            oldest = self._db.execute("SELECT MIN(created_at) FROM jobs WHERE status = 'pending'").fetchone()[0]
+        counts = {'pending': 0, 'running': 0, 'done': 0, 'failed': 0}
+        counts.update(dict(rows))
+        return {
+            "depth": counts['pending'] + counts['running'],
+            "counts": counts,
+            "oldest_pending_seconds": round(time.time() - oldest, 1) if oldest else 0,
+            "workers": len(self._threads)
+        }
+
+    def _requeue_stale(self, now):
+        # Running for too long means the worker died mid-job (a restart, or another process crashing) — run it again
+        self._db.execute("UPDATE jobs SET status = 'pending', updated_at = ? WHERE status = 'running' AND updated_at < ?",
+                         (now, now - self.stale_seconds))
+
+    def _claim(self):
+        """The next due job, plus more due jobs of the same name if its handler takes batches."""
+        now = time.time()
+        columns = "SELECT id, name, payload, attempts FROM jobs WHERE status = 'pending' AND run_at <= ?"
+        claimed = []
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._requeue_stale(now)
+                rows = self._db.execute(columns + " ORDER BY run_at LIMIT 1", (now,)).fetchall()
+                if rows and self.batch_sizes.get(rows[0][1], 1) > 1:
+                    rows += self._db.execute(columns + " AND name = ? AND id != ? ORDER BY run_at LIMIT ?",
+                                             (now, rows[0][1], rows[0][0], self.batch_sizes[rows[0][1]] - 1)).fetchall()
+                for row in rows:
+                    cur = self._db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, updated_at = ? "
+                        "WHERE id = ? AND status = 'pending'", (now, row[0]))
+                    if cur.rowcount:
+                        claimed.append((row[0], row[1], json.loads(row[2]), row[3] + 1))
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return claimed
+
+    def _finish(self, job_id, attempts, error=None):
+        now = time.time()
+        with self._lock:
+            if error is None:
+                self._db.execute("UPDATE jobs SET status = 'done', updated_at = ?, last_error = NULL WHERE id = ?",
+                                 (now, job_id))
+                self._db.execute("DELETE FROM jobs WHERE status = 'done' AND updated_at < ?",
+                                 (now - self.keep_done_hours * 3600,))
+            elif attempts >= self.max_attempts:
+                self._db.execute("UPDATE jobs SET status = 'failed', updated_at = ?, last_error = ? WHERE id = ?",
+                                 (now, error, job_id))
+            else:
+                delay = min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+                self._db.execute("UPDATE jobs SET status = 'pending', run_at = ?, updated_at = ?, last_error = ? WHERE id = ?",
+                                 (now + delay, now, error, job_id))
+
+    def _worker(self):
+        while not self._stop.is_set():
+            jobs = self._claim()
+            if not jobs:
+                self._wake.wait(0.5)
+                self._wake.clear()
+                continue
+            job_id, name, payload, attempts = jobs[0]
+            fn = self.handlers.get(name)
+            if not fn:
+                self._finish(job_id, self.max_attempts, f"No handler registered for {name}")
+                continue
+            if self.batch_sizes.get(name, 1) > 1:
+                # A backlog of the same job type goes to the handler in one call
+                self._run_batch(fn, name, jobs)
+                continue
+            try:
+                fn(**payload)
+                self._finish(job_id, attempts)
+            except Exception as e:
+                print(f"Job {name} failed (attempt {attempts}): {e}")
+                self._finish(job_id, attempts, str(e))
+
+    def _run_batch(self, fn, name, jobs):
+        try:
+            errors = fn([payload for _, _, payload, _ in jobs])
+        except Exception as e:
+            errors = [e] * len(jobs)
+        for (job_id, _, _, attempts), error in zip(jobs, errors):
+            if error is not None:
+                print(f"Job {name} failed (attempt {attempts}): {error}")
+            self._finish(job_id, attempts, None if error is None else str(error))
@@ -1,19 +1,65 @@
 import requests
+import random
 import time
 import os
+from datetime import datetime
+import pytz
 from dotenv import load_dotenv
 
 load_dotenv()
 BASE_URL = os.environ.get('BASE_URL', 'https://bear-team-answering-service.onrender.com')
+# Render spins a free instance down after ~15 idle minutes, so no interval may
+# reach that. Pings back off only while /warmup reports a real call recently,
+# because then the calls themselves keep the process warm.
+KEEP_ALIVE_SPIN_DOWN_MINUTES = float(os.environ.get('KEEP_ALIVE_SPIN_DOWN_MINUTES', 15))
+KEEP_ALIVE_IDLE_MINUTES = float(os.environ.get('KEEP_ALIVE_IDLE_MINUTES', 10))
+KEEP_ALIVE_BUSY_MINUTES = float(os.environ.get('KEEP_ALIVE_BUSY_MINUTES', 11))
+KEEP_ALIVE_RECENT_CALL_MINUTES = float(os.environ.get('KEEP_ALIVE_RECENT_CALL_MINUTES', 5))  # A call this recent counts as traffic
+KEEP_ALIVE_JITTER = float(os.environ.get('KEEP_ALIVE_JITTER', 0.2))  # +/- fraction, so instances don't ping in step
+KEEP_ALIVE_TIMEZONE = pytz.timezone(os.environ.get('KEEP_ALIVE_TIMEZONE', 'America/New_York'))
+KEEP_ALIVE_BUSINESS_HOURS = os.environ.get('KEEP_ALIVE_BUSINESS_HOURS', '8-17')
+KEEP_ALIVE_BUSINESS_DAYS = [int(d) for d in os.environ.get('KEEP_ALIVE_BUSINESS_DAYS', '0,1,2,3,4').split(',')]
+
+
+def in_business_hours(now=None):
+    now = now or datetime.now(KEEP_ALIVE_TIMEZONE)
+    start, end = (int(h) for h in KEEP_ALIVE_BUSINESS_HOURS.split('-'))
+    return now.weekday() in KEEP_ALIVE_BUSINESS_DAYS and start <= now.hour < end
+
+
+def next_interval(seconds_since_last_call=None, now=None):
+    """Seconds until the next ping: the busy interval while calls are coming in during business hours, else
+    the idle one, with random jitter — and always a minute short of the spin-down window."""
+    recent = seconds_since_last_call is not None and seconds_since_last_call < KEEP_ALIVE_RECENT_CALL_MINUTES * 60
+    minutes = KEEP_ALIVE_BUSY_MINUTES if recent and in_business_hours(now) else KEEP_ALIVE_IDLE_MINUTES
+    seconds = minutes * 60 * random.uniform(1 - KEEP_ALIVE_JITTER, 1 + KEEP_ALIVE_JITTER)
+    return min(seconds, (KEEP_ALIVE_SPIN_DOWN_MINUTES - 1) * 60)
+
+
 def ping():
+    """Hit /warmup so connections and caches are primed, not just the process kept alive.
+    Returns the seconds since the last real call, if the server reported it."""
     try:
-        response = requests.get(BASE_URL + '/status', timeout=10)
-        print(f"Pinged {BASE_URL} - Status: {response.status_code}")
+        response = requests.post(BASE_URL + '/warmup', timeout=60)
+        if response.status_code == 404:
+            # Older deploy without /warmup
+            response = requests.get(BASE_URL + '/status', timeout=10)
+            print(f"Pinged {BASE_URL} - Status: {response.status_code}")
+            return None
+        report = response.json()
+        steps = ", ".join(f"{name}={ms:.0f}ms" for name, ms in report.get('steps_ms', {}).items())
+        print(f"Warmed {BASE_URL} in {report.get('total_ms', 0):.0f}ms"
+              f"{' (cached)' if report.get('cached') else ''}: {steps}")
+        for name, error in report.get('errors', {}).items():
+            print(f"  {name} failed: {error}")
+        return report.get('seconds_since_last_call')
     except Exception as e:
         print(f"Ping failed: {e}")
+        return None
+
 
 if __name__ == "__main__":
-    print(f"Keeping {BASE_URL} awake - pinging every 10 minutes...")
+    print(f"Keeping {BASE_URL} warm - every ~{KEEP_ALIVE_IDLE_MINUTES:g} minutes, "
+          f"~{KEEP_ALIVE_BUSY_MINUTES:g} while calls are coming in during business hours...")
     while True:
-        ping()
-        time.sleep(600)  # 10 minutes
+        time.sleep(next_interval(ping()))
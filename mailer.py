@@ -0,0 +1,140 @@
+import atexit
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+# ── Pooled SMTP Mailer ──
+# Keeps authenticated SMTP connections open between messages instead of
+# doing a TCP + STARTTLS + login handshake per email. Connections idle for
+# longer than idle_timeout, or dropped by the server, are reopened.
+# digest_minutes is how often low-priority notifications should go out as
+# one digest; the caller keeps those items somewhere durable until
+# send_digest() has delivered them.
+
+
+class Mailer:
+    def __init__(self, host='smtp.gmail.com', port=587, username=None, password=None, sender=None, recipient=None,
+                 starttls=True, pool_size=2, idle_timeout=240, digest_minutes=0, digest_subject='Notification digest'):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.sender = sender or username
+        self.recipient = recipient
+        self.starttls = starttls
+        self.idle_timeout = idle_timeout
+        self.digest_minutes = digest_minutes
+        self.digest_subject = digest_subject
+        self._pool = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+
+    def configured(self):
+        return bool(self.host and self.sender and self.recipient)
+
+    # ── Connections ──
+
+    def _connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=30)
+        if self.starttls:
+            server.starttls()
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        return server
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            try:
+                server, last_used = self._pool.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.time() - last_used <= self.idle_timeout:
+                return server
+            self._discard(server)
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, server):
+        self._pool.put((server, time.time()))
+        self._slots.release()
+
+    def _discard(self, server):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def warm_up(self):
+        """Open (or check) a pooled connection so the next send skips the TLS and login round trips."""
+        if not self.configured():
+            return False
+        server = self._acquire()
+        try:
+            server.noop()
+        except Exception:
+            self._discard(server)
+            self._slots.release()
+            raise
+        self._release(server)
+        return True
+
+    def start(self):
+        atexit.register(self.close)
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(server)
+
+    # ── Sending ──
+
+    def build_message(self, subject, body):
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = self.recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+        return msg
+
+    def send(self, subject, body):
+        """Send now over a pooled connection. Raises if delivery fails after one reconnect."""
+        msg = self.build_message(subject, body)
+        server = self._acquire()
+        try:
+            try:
+                server.send_message(msg)
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # Server dropped the idle connection — reconnect once and retry
+                self._discard(server)
+                server = None
+                server = self._connect()
+                server.send_message(msg)
+        except Exception:
+            if server:
+                self._discard(server)
+            self._slots.release()
+            raise
+        self._release(server)
+        print(f"Email sent: {subject}")
+
+    def send_digest(self, items):
+        """Send [(subject, body), ...] now as one email. Raises like send(), so the caller keeps the items on failure."""
+        if not items:
+            return
+        body = f"{len(items)} notifications since the last digest\n\n"
+        for subject, text in items:
+            body += f"{'=' * 50}\n{subject}\n{'=' * 50}\n{text}\n\n"
+        self.send(f"{self.digest_subject} ({len(items)})", body)
+
+    def next_digest_in(self, now=None):
+        """Seconds until the next digest boundary, so items from one period go out together."""
+        period = self.digest_minutes * 60
+        return period - (now or time.time()) % period
@@ -0,0 +1,161 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# ── Metrics ──
+# Counters and histograms keep one shard per thread, so recording a value is
+# a plain list update with no lock; the shards are only summed when /metrics
+# is scraped. Rendered in the Prometheus text format.
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Shards:
+    def __init__(self, size):
+        self.size = size
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()
+
+    def mine(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = [0] * self.size
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+        return shard
+
+    def totals(self):
+        with self._lock:
+            shards = list(self._shards)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self.size
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.label_names and self.kind != 'gauge':
+            self._child(())  # Unlabelled metrics report 0 before their first update
+
+    def _child(self, values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_text(self, values, extra=()):
+        pairs = list(zip(self.label_names, values)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._render_child(values, child))
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def _new_child(self):
+        return _Shards(1)
+
+    def inc(self, *labels, amount=1):
+        self._child(labels).mine()[0] += amount
+
+    def value(self, *labels):
+        child = self._children.get(labels)
+        return child.totals()[0] if child else 0
+
+    def _render_child(self, values, child):
+        return [f"{self.name}{self._label_text(values)} {child.totals()[0]}"]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help_text, labels)
+
+    def _new_child(self):
+        # One slot per bucket, one for +Inf, one for the running sum
+        return _Shards(len(self.buckets) + 2)
+
+    def observe(self, value, *labels):
+        shard = self._child(labels).mine()
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                shard[i] += 1
+                break
+        else:
+            shard[-2] += 1
+        shard[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _render_child(self, values, child):
+        totals = child.totals()
+        lines, cumulative = [], 0
+        for bound, count in zip(self.buckets + ('+Inf',), totals[:-1]):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._label_text(values, [('le', bound)])} {cumulative}")
+        lines.append(f"{self.name}_sum{self._label_text(values)} {round(totals[-1], 6)}")
+        lines.append(f"{self.name}_count{self._label_text(values)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Read from a callback at scrape time."""
+    kind = 'gauge'
+
+    def __init__(self, name, help_text, read):
+        super().__init__(name, help_text)
+        self.read = read
+
+    def render(self):
+        try:
+            value = self.read()
+        except Exception:
+            return []
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge", f"{self.name} {value}"]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()):
+        return self._add(Counter(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def gauge(self, name, help_text, read):
+        return self._add(Gauge(name, help_text, read))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
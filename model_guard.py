@@ -0,0 +1,150 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+# ── Model Call Guard ──
+# Every model request runs against a per-turn latency budget. Optionally a
+# second (hedged) request goes out once the first is slower than the recent
+# latency percentile, and whichever answers first wins. A circuit breaker
+# counts consecutive failures; once it trips, callers go straight to the
+# fallback path until a probe request gets through again.
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_seconds=30):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.trips = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if time.time() - self.opened_at >= self.reset_seconds else 'open'
+
+    def available(self):
+        """False while tripped. After reset_seconds requests are let through again as probes."""
+        return self.state != 'open'
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.opened_at is not None:
+                self.opened_at = time.time()  # A failed probe keeps it open for another period
+            elif self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+                self.trips += 1
+                print(f"Model circuit breaker open after {self.failures} failures")
+
+
+class LatencyWindow:
+    def __init__(self, size=200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples=20):
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class ModelGuard:
+    def __init__(self, budget_seconds=6.0, hedge=False, hedge_percentile=95, hedge_default_seconds=3.0,
+                 failure_threshold=5, reset_seconds=30, max_workers=32):
+        self.budget_seconds = budget_seconds
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_default_seconds = hedge_default_seconds
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+        self.latency = LatencyWindow()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="model-call")
+        self.timeouts = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def available(self):
+        return self.breaker.available()
+
+    def hedge_delay(self):
+        observed = self.latency.percentile(self.hedge_percentile)
+        return observed if observed is not None else self.hedge_default_seconds
+
+    def _timed(self, fn):
+        started = time.perf_counter()
+        result = fn()
+        self.latency.add(time.perf_counter() - started)
+        return result
+
+    def call(self, fn):
+        """fn() within the latency budget. Raises CircuitOpenError, TimeoutError or fn's own error."""
+        if not self.breaker.available():
+            raise CircuitOpenError("Model circuit breaker is open")
+        started = time.perf_counter()
+        deadline = started + self.budget_seconds
+        hedge_at = started + self.hedge_delay()
+        first = self._executor.submit(self._timed, fn)
+        futures = [first]
+        hedged = False
+        last_error = None
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            can_hedge = self.hedge and not hedged
+            if can_hedge and (not futures or now >= hedge_at):
+                # Slow (or already failed) first request — race a second one
+                hedged = True
+                self.hedges += 1
+                futures.append(self._executor.submit(self._timed, fn))
+                continue
+            if not futures:
+                break
+            timeout = min(deadline, hedge_at) - now if can_hedge else deadline - now
+            done, _ = wait(futures, timeout=max(0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                futures.remove(future)
+                error = future.exception()
+                if error is None:
+                    self.breaker.record_success()
+                    if future is not first:
+                        self.hedge_wins += 1
+                    return future.result()
+                last_error = error
+        # Anything still running finishes in the background, bounded by the client timeout
+        self.breaker.record_failure()
+        if futures or last_error is None:
+            self.timeouts += 1
+            raise TimeoutError(f"Model call exceeded {self.budget_seconds}s budget")
+        raise last_error
+
+    def stats(self):
+        p95 = self.latency.percentile(95)
+        return {
+            "circuit": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "trips": self.breaker.trips,
+            "timeouts": self.timeouts,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p95_seconds": round(p95, 3) if p95 is not None else None
+        }
@@ -0,0 +1,120 @@
+import difflib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from response_cache import normalize_utterance
+
+# ── Speculative Prefetch ──
+# Twilio posts partial transcripts while the caller is still talking. Once a
+# partial looks stable (Twilio's stability score, or the same words twice in a
+# row) the model request starts in the background. When the final
+# SpeechResult arrives it takes over that request if the text is close enough,
+# so model time overlaps the caller's end-of-speech pause instead of following
+# it. A prefetch whose text no longer matches is dropped and counted as wasted.
+
+
+def similarity(a, b):
+    return difflib.SequenceMatcher(None, a, b).ratio()
+
+
+class Prefetch:
+    __slots__ = ('text', 'future', 'started')
+
+    def __init__(self, text, future):
+        self.text = text
+        self.future = future
+        self.started = time.time()
+
+
+class SpeculativePrefetcher:
+    def __init__(self, max_workers=16, min_words=3, min_stability=0.8, match_ratio=0.9, stale_seconds=60,
+                 observe=None):
+        """observe(result) is called with 'started', 'hit', 'miss' or 'wasted' for each prefetch outcome."""
+        self.min_words = min_words
+        self.min_stability = min_stability
+        self.match_ratio = match_ratio
+        self.stale_seconds = stale_seconds
+        self.observe = observe
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="prefetch")
+        self._last_partial = {}  # call_sid -> (normalized text, seen_at)
+        self._pending = {}  # call_sid -> Prefetch
+        self._lock = threading.Lock()
+        self.counts = {'started': 0, 'hit': 0, 'miss': 0, 'wasted': 0}
+
+    def _count(self, result):
+        with self._lock:
+            self.counts[result] += 1
+        if self.observe:
+            self.observe(result)
+
+    def is_stable(self, call_sid, text, stability=None):
+        """True once a partial transcript is worth starting a model call for."""
+        normalized = normalize_utterance(text)
+        if len(normalized.split()) < self.min_words:
+            return False
+        with self._lock:
+            previous = self._last_partial.get(call_sid)
+            self._last_partial[call_sid] = (normalized, time.time())
+        if stability is not None and stability >= self.min_stability:
+            return True
+        return previous is not None and previous[0] == normalized
+
+    def start(self, call_sid, text, fn, *args, **kwargs):
+        """Run fn in the background for this partial unless a prefetch for near-identical text is already going."""
+        normalized = normalize_utterance(text)
+        replaced = None
+        with self._lock:
+            stale = self._drop_stale()
+            current = self._pending.get(call_sid)
+            started = not current or similarity(current.text, normalized) < self.match_ratio
+            if started:
+                replaced = current
+                self._pending[call_sid] = Prefetch(normalized, self._executor.submit(fn, *args, **kwargs))
+        if replaced:
+            replaced.future.cancel()  # Only stops it if it hasn't started; a running model call finishes unused
+        for _ in range(stale + bool(replaced)):
+            self._count('wasted')
+        if started:
+            self._count('started')
+        return started
+
+    def claim(self, call_sid, final_text):
+        """The prefetched future if its text matches the final transcript closely enough, else None."""
+        with self._lock:
+            self._last_partial.pop(call_sid, None)
+            prefetch = self._pending.pop(call_sid, None)
+        if prefetch is None:
+            return None
+        if similarity(prefetch.text, normalize_utterance(final_text)) >= self.match_ratio:
+            self._count('hit')
+            return prefetch.future
+        prefetch.future.cancel()
+        self._count('miss')
+        return None
+
+    def discard(self, call_sid):
+        """The turn was answered without the model — drop any prefetch for it."""
+        with self._lock:
+            self._last_partial.pop(call_sid, None)
+            prefetch = self._pending.pop(call_sid, None)
+        if prefetch:
+            prefetch.future.cancel()
+            self._count('wasted')
+
+    def _drop_stale(self):
+        # Callers who hung up mid-sentence never post a final result
+        cutoff = time.time() - self.stale_seconds
+        stale = [sid for sid, p in self._pending.items() if p.started < cutoff]
+        for call_sid in stale:
+            del self._pending[call_sid]
+        for call_sid in [sid for sid, (_, seen) in self._last_partial.items() if seen < cutoff]:
+            del self._last_partial[call_sid]
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            pending = len(self._pending)
+        claimed = counts['hit'] + counts['miss']
+        return dict(counts, pending=pending, hit_rate=round(counts['hit'] / claimed, 3) if claimed else None)
@@ -0,0 +1,63 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# ── Response Cache ──
+# Most calls open with nearly the same line ("I want to buy a house"). Model
+# answers for early, call-independent turns are cached under the normalized
+# utterance plus the script step, with LRU + TTL eviction.
+
+FILLER_WORDS = {'um', 'uh', 'uhh', 'umm', 'er', 'ah', 'like', 'so', 'well', 'yeah', 'hi', 'hello', 'hey', 'okay', 'ok',
+                'oh', 'just', 'actually', 'basically', 'please', 'yes', 'i', 'im', "i'm", 'a', 'an', 'the', 'to', 'and'}
+PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_utterance(text):
+    words = PUNCTUATION.sub('', text.lower()).split()
+    return " ".join(w for w in words if w not in FILLER_WORDS)
+
+
+class ResponseCache:
+    def __init__(self, max_entries=500, ttl_seconds=3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._items = OrderedDict()  # key -> (answer, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, utterance, step, scope=None):
+        """scope keeps answers apart when one process serves several businesses."""
+        normalized = normalize_utterance(utterance)
+        return (scope, normalized, step) if normalized else None
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or now - entry[1] >= self.ttl_seconds:
+                if entry is not None:
+                    del self._items[key]
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, answer):
+        with self._lock:
+            self._items[key] = (answer, time.time())
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._items),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
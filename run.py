@@ -1,8 +1,55 @@
 import os
-from waitress import serve
-from bear_team_phone_system import app
+import signal
+import sys
+import threading
+from waitress import create_server
 
-if __name__ == '__main__':
+# 'threaded' is plain waitress. 'concurrent' is for many simultaneous calls:
+# webhook threads only build TwiML, model turns run on the async turn pool and
+# end-of-call I/O on the job workers, so a slow backend can't starve the
+# threads that answer Twilio.
+SERVE_MODE = os.environ.get('SERVE_MODE', 'threaded')
+if SERVE_MODE == 'concurrent':
+    os.environ.setdefault('ASYNC_TURNS', 'true')
+    os.environ.setdefault('ASYNC_TURN_WORKERS', '128')
+    os.environ.setdefault('JOB_WORKERS', '8')
+
+from bear_team_phone_system import app, shutdown, warm_up
+
+WARM_UP = os.environ.get('WARM_UP', 'true').lower() != 'false'
+
+
+def server_options():
+    if SERVE_MODE == 'concurrent':
+        return {
+            'threads': int(os.environ.get('WAITRESS_THREADS', 32)),
+            'connection_limit': int(os.environ.get('WAITRESS_CONNECTION_LIMIT', 1000)),
+            'backlog': int(os.environ.get('WAITRESS_BACKLOG', 2048)),
+            'channel_timeout': int(os.environ.get('WAITRESS_CHANNEL_TIMEOUT', 30)),
+            'asyncore_use_poll': True  # select() tops out at 1024 sockets
+        }
+    return {'threads': int(os.environ.get('WAITRESS_THREADS', 4))}
+
+
+def stop(signum, frame):
+    print("SIGTERM received, shutting down")
+    shutdown()
+    sys.exit(0)
+
+
+def main():
     port = int(os.environ.get('PORT', 10000))
-    print(f"Starting server on port {port}")
-    serve(app, host='0.0.0.0', port=port)
+    options = server_options()
+    print(f"Starting server on port {port} ({SERVE_MODE}, {options['threads']} threads)")
+    server = create_server(app, host='0.0.0.0', port=port, **options)
+    server.print_listen("Serving on http://{}:{}")
+    # Render stops the service with SIGTERM, which skips atexit — flush Sheets and close SMTP before exiting
+    signal.signal(signal.SIGTERM, stop)
+    if WARM_UP:
+        # The socket is bound, so Twilio can already reach us while the client libraries load
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+    server.run()
+
+
+if __name__ == '__main__':
+    main()
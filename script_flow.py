@@ -0,0 +1,225 @@
+import re
+import threading
+
+# ── Scripted Call Flow ──
+# The receptionist script is fixed: intent → name → phone → day/time →
+# confirm. When the caller's answer fits the slot we're waiting on, the next
+# line comes from a template instead of a model round trip. Anything that
+# doesn't fit falls through to the model. A requested time is checked against
+# the calendar before it is confirmed; if it's taken the caller is offered the
+# nearest opening, and only a slot they accepted is ever booked.
+
+NAME_PATTERN = re.compile(r"\b(?:my name is|my name's|name is|this is|call me|i'm|i am|im)\s+([a-z]+(?:\s+[a-z]+)?)",
+                          re.IGNORECASE)
+NAME_FILLERS = {'sure', 'yes', 'yeah', 'ok', 'okay', 'um', 'uh', 'hi', 'hello', 'its', "it's", 'it', 'is', 'name', 'my', 'me',
+                'just', 'really', 'so'}
+# Words that are never (part of) the caller's name — "I'm looking to buy", "maybe later", "go ahead"
+NOT_NAMES = {'no', 'nope', 'not', 'why', 'what', 'who', 'hold', 'wait', 'sorry', 'thanks', 'thank', 'you', 'bye',
+             'goodbye', 'buy', 'buying', 'sell', 'selling', 'rent', 'renting', 'help', 'question', 'house', 'home',
+             'right', "that's", 'correct', 'yep', 'yup', 'at', 'am', 'pm', 'today', 'tomorrow', 'monday', 'tuesday',
+             'wednesday', 'thursday', 'friday', 'saturday', 'sunday', 'morning', 'afternoon', 'evening', 'number',
+             'phone', 'how', 'much', 'where', 'when', 'which', 'anyone', 'anybody', 'someone', 'there', 'here',
+             'husband', 'wife', 'partner', 'son', 'daughter', 'mom', 'dad', 'mother', 'father', 'friend', 'boyfriend',
+             'girlfriend', 'calling', 'about', 'looking', 'interested', 'trying', 'going', 'wondering', 'thinking',
+             'a', 'an', 'the', 'from', 'to', 'for', 'with', 'in', 'on', 'of', 'and', 'but', 'or', 'i', "i'm", 'im',
+             'we', 'they', 'he', 'she', 'this', 'that', 'maybe', 'later', 'go', 'ahead', 'good', 'fine', 'great',
+             'well', 'ready', 'busy', 'back', 'still', 'also', 'want', 'need', 'like', 'please', 'hey', 'call',
+             'again', 'agent', 'realtor', 'listing', 'property', 'apartment', 'okay', 'alright', 'perfect'}
+# A reply opening with one of these is a question or about someone else, not the caller's name
+NOT_A_NAME_OPENERS = {'is', 'are', 'can', 'could', 'do', 'does', 'did', 'will', 'would', 'my', 'our'}
+YES_PATTERN = re.compile(r"\b(?:yes|yeah|yep|yup|correct|right|sure|that works|that's (?:it|right|me|fine|good)|it is|perfect)\b", re.IGNORECASE)
+NO_PATTERN = re.compile(r"\b(?:no|nope|not|isn't|that's not|wrong|different number|another number)\b", re.IGNORECASE)
+PHONE_PATTERN = re.compile(r"(?:\d[\s.-]?){10,11}")
+
+INTENT_PHRASES = {'buyer': 'buying a home', 'seller': 'selling your home', 'renter': 'finding a rental'}
+
+
+def extract_caller_name(caller_questions):
+    for question in reversed(caller_questions):
+        match = NAME_PATTERN.search(question)
+        if match:
+            words = []
+            for word in match.group(1).split():
+                if not is_name_word(word):
+                    break  # "I'm John and ..." keeps John; "I'm looking ..." isn't a name at all
+                words.append(word)
+            if words:
+                return " ".join(w.capitalize() for w in words)
+    return None
+
+
+def is_name_word(word):
+    word = word.lower()
+    return len(word) > 1 and word not in NOT_NAMES and re.fullmatch(r"[a-z][a-z'-]*", word) is not None
+
+
+def name_from_reply(question):
+    """A name from an answer to "May I have your name?" — e.g. "John", "Sure, John Smith"."""
+    name = extract_caller_name([question])
+    if name:
+        return name
+    if re.search(r'\d', question) or question.rstrip().endswith('?'):
+        return None
+    words = re.findall(r"[a-z']+", question.lower())
+    if words and words[0] in NOT_A_NAME_OPENERS:
+        return None
+    words = [w for w in words if w not in NAME_FILLERS]
+    if 1 <= len(words) <= 3 and all(is_name_word(w) for w in words):
+        return " ".join(w.capitalize() for w in words)
+    return None
+
+
+def speakable_phone(number):
+    digits = re.sub(r'\D', '', number or '')
+    if len(digits) == 11 and digits.startswith('1'):
+        digits = digits[1:]
+    if len(digits) != 10:
+        return number
+    # Spaced digits with pauses read back naturally on TTS
+    return f"{' '.join(digits[:3])}, {' '.join(digits[3:6])}, {' '.join(digits[6:])}"
+
+
+def speakable_slot(slot):
+    return slot.strftime('%A at %I:%M %p').replace(':00', '').replace(' 0', ' ')
+
+
+class ScriptFlow:
+    def __init__(self, parse_time, min_confidence=0.7, open_slots=None, resolve_slot=None):
+        """open_slots(conversation) lists openings to offer; resolve_slot(conversation, slot) returns the slot if
+        it's free, the nearest opening if not, or None."""
+        self.parse_time = parse_time
+        self.min_confidence = min_confidence
+        self.open_slots = open_slots
+        self.resolve_slot = resolve_slot
+        self._lock = threading.Lock()
+        self.local_turns = 0
+        self.model_turns = 0
+
+    def expected_step(self, conversation):
+        if not conversation.caller_intent:
+            return 'intent'
+        if not conversation.caller_name:
+            return 'name'
+        if not conversation.callback_number:
+            return 'phone'
+        if conversation.offered_slot:
+            return 'offer'
+        if not conversation.agreed_slot:
+            return 'time'
+        return None
+
+    def handle(self, conversation, step, question):
+        """Reply for the turn if it filled the expected slot, otherwise None (use the model)."""
+        answer = self._answer(conversation, step, question)
+        with self._lock:
+            if answer:
+                self.local_turns += 1
+            else:
+                self.model_turns += 1
+        return answer
+
+    def would_answer(self, conversation, step, question):
+        """Whether handle() would reply without the model. May fill slots on conversation — pass a copy."""
+        if step in ('time', 'offer') and (self._requested_time(conversation, question)
+                                          or self._chosen_opening(conversation, question)):
+            return True  # Answered locally whatever the calendar says — don't query it for a guess
+        return self._answer(conversation, step, question) is not None
+
+    def _answer(self, conversation, step, question):
+        if step == 'intent':
+            if conversation.caller_intent in INTENT_PHRASES:
+                return f"I can help you with {INTENT_PHRASES[conversation.caller_intent]}. May I have your name?"
+        elif step == 'name':
+            name = name_from_reply(question)
+            if name:
+                conversation.caller_name = name
+                return f"Thanks, {name}. Is {speakable_phone(conversation.caller_id)} the best number to reach you?"
+        elif step == 'phone':
+            spoken = PHONE_PATTERN.search(question)
+            if spoken:
+                conversation.callback_number = re.sub(r'\D', '', spoken.group(0))
+                return "Got it. " + self._ask_for_time(conversation)
+            # Negation first — "that's not right" also contains "right"
+            if NO_PATTERN.search(question):
+                return "No problem. What is the best number to reach you?"
+            if YES_PATTERN.search(question):
+                conversation.callback_number = conversation.caller_id
+                return "Perfect. " + self._ask_for_time(conversation)
+        elif step in ('time', 'offer'):
+            requested = self._requested_time(conversation, question) or self._chosen_opening(conversation, question)
+            if requested:
+                return self._check_slot(conversation, requested)
+            if step == 'time' and len(conversation.openings) > 1 and YES_PATTERN.search(question) \
+                    and not NO_PATTERN.search(question):
+                return f"Which works best for you: {self._list_openings(conversation.openings, 'or')}?"
+            if step == 'offer' and NO_PATTERN.search(question):
+                conversation.offered_slot = None
+                return "No problem. What other day and time would work for you?"
+            if step == 'offer' and YES_PATTERN.search(question):
+                return self._agree(conversation, conversation.offered_slot)
+        return None
+
+    def _requested_time(self, conversation, question):
+        """The time asked for in this turn, including one that finishes an earlier turn ("Wednesday" ... "at 2")."""
+        parsed = self.parse_time([question], conversation)
+        if not parsed or parsed.confidence < self.min_confidence:
+            parsed = self.parse_time(conversation.caller_questions, conversation)
+            if not parsed or parsed.utterance_index != len(conversation.caller_questions) - 1:
+                return None
+        return parsed.slot if parsed.confidence >= self.min_confidence else None
+
+    def _chosen_opening(self, conversation, question):
+        """The opening we offered that this reply picks: the one on the day it names ("Tuesday works"), or the
+        only one offered if it's a plain yes."""
+        openings = conversation.openings
+        if not openings:
+            return None
+        parsed = self.parse_time([question], conversation)
+        if parsed:
+            if re.search(r"\b(?:not|no)\s+(?:on\s+)?" + re.escape(parsed.text.split()[0]), question, re.IGNORECASE):
+                return None  # "Not Monday"
+            return next((o for o in openings if o.date() == parsed.slot.date()), None)
+        if len(openings) == 1 and YES_PATTERN.search(question) and not NO_PATTERN.search(question):
+            return openings[0]
+        return None
+
+    @staticmethod
+    def _list_openings(openings, conjunction='and'):
+        spoken = [speakable_slot(o) for o in openings]
+        return spoken[0] if len(spoken) == 1 else f"{', '.join(spoken[:-1])} {conjunction} {spoken[-1]}"
+
+    def _check_slot(self, conversation, requested):
+        slot = self.resolve_slot(conversation, requested) if self.resolve_slot else requested
+        if slot == requested:
+            return self._agree(conversation, slot)
+        conversation.offered_slot = slot
+        if not slot:
+            return f"I'm sorry, I don't have anything open near {speakable_slot(requested)}. What other day and time works for you?"
+        return f"I don't have {speakable_slot(requested)} open. How about {speakable_slot(slot)}?"
+
+    def _agree(self, conversation, slot):
+        conversation.offered_slot = None
+        conversation.openings = []
+        conversation.agreed_slot = slot
+        return (f"Great, I have you down for {slot.strftime('%A, %B %d at %I:%M %p').replace(' 0', ' ')}. "
+                "The agent will call you to confirm. Is there anything else I can help with?")
+
+    def _ask_for_time(self, conversation):
+        # A time the caller gave before we asked is checked now instead of asking again
+        parsed = self.parse_time(conversation.caller_questions, conversation)
+        if parsed and parsed.confidence >= self.min_confidence:
+            return self._check_slot(conversation, parsed.slot)
+        openings = self.open_slots(conversation) if self.open_slots else []
+        if openings:
+            conversation.openings = openings  # Remembered so "Tuesday works" or "yes" can pick one
+            return f"What day and time works best for you? I have openings {self._list_openings(openings)}."
+        return "What day and time works best for you?"
+
+    def stats(self):
+        with self._lock:
+            total = self.local_turns + self.model_turns
+            return {
+                "local_turns": self.local_turns,
+                "model_turns": self.model_turns,
+                "local_rate": round(self.local_turns / total, 3) if total else 0.0
+            }
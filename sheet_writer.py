@@ -0,0 +1,109 @@
+import atexit
+import json
+import os
+import threading
+import time
+
+# ── Batched Sheets Writer ──
+# Rows are buffered (and spooled to local disk) and written with a single
+# append_rows call once batch_size rows are waiting or flush_interval seconds
+# have passed. Quota errors back off instead of dropping rows.
+
+
+def is_quota_error(error):
+    status = getattr(getattr(error, 'response', None), 'status_code', None)
+    return status == 429 or 'RATE_LIMIT_EXCEEDED' in str(error) or 'Quota exceeded' in str(error)
+
+
+class BufferedSheetWriter:
+    def __init__(self, get_worksheet, batch_size=20, flush_interval=10.0, spool_path=None, max_backoff=300.0,
+                 observe=None):
+        self.get_worksheet = get_worksheet
+        self.observe = observe  # called with the seconds each append_rows took
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.spool_path = spool_path
+        self.max_backoff = max_backoff
+        self._rows = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._backoff = 0
+        self._retry_at = 0
+        self._thread = None
+        if spool_path and os.path.exists(spool_path):
+            with open(spool_path) as f:
+                self._rows = [json.loads(line) for line in f if line.strip()]
+            if self._rows:
+                print(f"Sheets writer: {len(self._rows)} spooled rows waiting from last run")
+
+    def append(self, row):
+        with self._lock:
+            self._rows.append(row)
+            if self.spool_path:
+                with open(self.spool_path, 'a') as f:
+                    f.write(json.dumps(row) + "\n")
+            if len(self._rows) >= self.batch_size:
+                self._wake.set()
+
+    def pending(self):
+        with self._lock:
+            return len(self._rows)
+
+    def start(self):
+        if self._thread:
+            return
+        self._thread = threading.Thread(target=self._run, name="sheet-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)  # Normal interpreter exit; run.py calls close on SIGTERM
+
+    def close(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join(5)
+            self._thread = None
+        # Last chance for anything still buffered — ignore backoff on shutdown
+        self._retry_at = 0
+        self.flush()
+
+    def flush(self):
+        """Write every buffered row with one append_rows call. Returns the number of rows written."""
+        with self._flush_lock:
+            if time.time() < self._retry_at:
+                return 0
+            with self._lock:
+                batch = list(self._rows)
+            if not batch:
+                return 0
+            started = time.perf_counter()
+            try:
+                self.get_worksheet().append_rows(batch)
+            except Exception as e:
+                if self.observe:
+                    self.observe(time.perf_counter() - started)
+                self._backoff = min(self.max_backoff, max(self.flush_interval, self._backoff * 2))
+                self._retry_at = time.time() + self._backoff
+                kind = "quota" if is_quota_error(e) else "error"
+                print(f"Sheets batch {kind}, retrying {len(batch)} rows in {self._backoff:.0f}s: {e}")
+                return 0
+            if self.observe:
+                self.observe(time.perf_counter() - started)
+            self._backoff = 0
+            with self._lock:
+                del self._rows[:len(batch)]
+                if self.spool_path:
+                    with open(self.spool_path, 'w') as f:
+                        for row in self._rows:
+                            f.write(json.dumps(row) + "\n")
+            print(f"Logged {len(batch)} rows to Sheets")
+            return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            self.flush()
@@ -0,0 +1,254 @@
+import json
+import os
+import re
+import threading
+import time
+
+import pytz
+
+from classifier import CallClassifier
+
+# ── Tenants ──
+# One process can answer for many brokerages. Each tenant is a JSON file in
+# TENANTS_DIR; everything a webhook needs (prompt blocks, routing table,
+# keyword matcher, business hours) is built once when the file is loaded, and
+# the Twilio `To` number picks the tenant with a dict lookup. The directory is
+# polled for changes and edited files are swapped in without a restart.
+#
+# A tenant file (tenants/acme.json):
+#   {"name": "Acme Realty", "short_name": "Acme", "city": "Tampa, Florida",
+#    "numbers": ["+18135550100"], "timezone": "America/New_York",
+#    "business_hours": [8, 17], "business_days": [0, 1, 2, 3, 4],
+#    "agents": {"sellers": {"name": "...", "role": "...", "phone": "...", "email": "...", "calendar_id": "..."}},
+#    "routing": {"seller": ["sellers"], "buyer": [...], "renter": [...]},
+#    "google": {"sheet_id": "...", "calendar_id": "...", "credentials_json_env": "ACME_GOOGLE_CREDENTIALS"},
+#    "email": {"username": "...", "recipient": "...", "password_env": "ACME_SMTP_PASSWORD"},
+#    "intent_keywords": {...}, "goodbye_phrases": [...], "knowledge": "...", "greeting": "..."}
+# Secrets are never stored in the file — *_env names the environment variable holding them.
+
+PROMPT_TEMPLATE = """You are a receptionist for {name} in {city}.
+
+CRITICAL RULES:
+1. NEVER use asterisks, markdown, bold, italics, bullet points, or any formatting. Your words are read aloud by a phone system and special characters will be spoken literally.
+2. Keep every response to 1-2 short sentences. Do NOT ramble, embellish, or give long explanations. Be brief and to the point.
+3. Your ONLY job is to book an appointment. Do not give sales pitches, describe services, or go off topic.
+
+YOUR SCRIPT — Follow these steps in order, one per response:
+Step 1: Greet them briefly. Ask what they are calling about (buying, selling, or renting).
+Step 2: Ask for their name.
+Step 3: Confirm their phone number by reading it back to them.
+Step 4: Ask what day and time works best for them.
+Step 5: Confirm the appointment details and let them know the agent will call to confirm. Say goodbye.
+
+AGENT ROUTING:
+{routing}
+
+If they ask a question you cannot answer, say: "Great question. I will have the agent go over that with you at your appointment."
+
+Do NOT ad-lib. Do NOT add extra information. Just follow the steps above."""
+
+ROUTING_LABELS = (('buyer', 'Buying a home'), ('seller', 'Selling a home'), ('renter', 'Rentals'))
+
+
+def normalize_number(number):
+    digits = re.sub(r'\D', '', number or '')
+    return digits[-10:] if len(digits) >= 10 else digits
+
+
+def build_system_prompt(name, city, agents, routing):
+    lines = []
+    for intent, label in ROUTING_LABELS:
+        names = [agents[key]['name'] for key in routing.get(intent, []) if key in agents]
+        if names:
+            lines.append(f"- {label}: {' or '.join(names)}")
+    return PROMPT_TEMPLATE.format(name=name, city=city, routing="\n".join(lines))
+
+
+class Tenant:
+    """A brokerage's settings with everything derived from them precomputed."""
+
+    def __init__(self, key, config, classifier=None, prompt=None):
+        self.key = key
+        self.config = config
+        self.name = config['name']
+        self.short_name = config.get('short_name', self.name)
+        self.city = config.get('city', '')
+        self.numbers = [normalize_number(n) for n in config.get('numbers', [])]
+        self.tz = pytz.timezone(config.get('timezone', 'America/New_York'))
+        self.hours_start, self.hours_end = config.get('business_hours', (8, 17))
+        self.business_days = tuple(config.get('business_days', (0, 1, 2, 3, 4)))
+        google = config.get('google', {})
+        self.agents = {}
+        for agent_key, agent in config.get('agents', {}).items():
+            self.agents[agent_key] = dict(agent, calendar_id=agent.get('calendar_id') or google.get('calendar_id'))
+        self.routing = config.get('routing', {'seller': ['sellers'], 'renter': ['rentals'], 'buyer': ['buyers1', 'buyers2']})
+        self.calendar_id = google.get('calendar_id')  # Shared calendar for bookings without an agent
+        self.calendar_ids = sorted({a['calendar_id'] for a in self.agents.values() if a['calendar_id']})
+        self.system_prompt = prompt or config.get('prompt') or build_system_prompt(
+            self.name, self.city, self.agents, self.routing)
+        if config.get('knowledge'):
+            self.system_prompt += "\n\nBUSINESS KNOWLEDGE:\n" + config['knowledge']
+        self.system_blocks = [{"type": "text", "text": self.system_prompt, "cache_control": {"type": "ephemeral"}}]
+        self.classifier = classifier or CallClassifier(config.get('intent_keywords'), config.get('goodbye_phrases'))
+        city_suffix = f" in {self.city.split(',')[0]}" if self.city else ""
+        self.greeting = config.get('greeting', f"Thank you for calling {self.name}{city_suffix}! How can I help you today?")
+        self.returning_greeting = config.get('returning_greeting',
+                                             f"Welcome back to {self.name}, {{first_name}}! How can I help you today?")
+        self.goodbye = f"Thanks for calling {self.name}! Have a great day!"
+        self.still_there = f"Are you still there? If not, thanks for calling {self.name}!"
+        self.services = None  # Google, Sheets, Calendar and SMTP clients, attached by the registry
+
+    def services_key(self):
+        """Tenants with the same integrations and hours share one set of clients."""
+        return json.dumps([self.config.get('google', {}), self.config.get('email', {}), self.calendar_ids,
+                           self.hours_start, self.hours_end, self.business_days, str(self.tz)], sort_keys=True)
+
+    def agent_for(self, intent, turn=0):
+        keys = [k for k in self.routing.get(intent, []) if k in self.agents]
+        if not keys:
+            return None
+        return self.agents[keys[turn % len(keys)]]  # Spread intents with several agents across them
+
+    def agent_keys_for(self, intent):
+        return [k for k in self.routing.get(intent, self.agents) if k in self.agents]
+
+
+class TenantServices:
+    """The Google, Sheets, Calendar and SMTP clients one or more tenants send through."""
+
+    def __init__(self, google_clients, sheet_writer, mailer, availability, booker, sheet_id=None):
+        self.google_clients = google_clients
+        self.sheet_writer = sheet_writer
+        self.mailer = mailer
+        self.availability = availability
+        self.booker = booker
+        self.sheet_id = sheet_id
+
+    def start(self):
+        if self.sheet_id:
+            self.sheet_writer.start()
+        self.mailer.start()
+
+    def close(self):
+        self.sheet_writer.close()
+        self.mailer.close()
+
+
+class TenantRegistry:
+    def __init__(self, directory, default, build_services=None, reload_seconds=5):
+        """default is the Tenant used for unknown numbers; build_services(tenant) returns its clients."""
+        self.directory = directory
+        self.default = default
+        self.build_services = build_services
+        self.reload_seconds = reload_seconds
+        self._by_key = {default.key: default}
+        self._by_number = {n: default for n in default.numbers}
+        self._services = {}
+        self._mtimes = {}
+        self._classifiers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.reloads = 0
+        self.load()
+
+    def for_number(self, number):
+        return self._by_number.get(normalize_number(number), self.default)
+
+    def get(self, key):
+        return self._by_key.get(key, self.default) if key else self.default
+
+    def all(self):
+        return list(self._by_key.values())
+
+    def _scan(self):
+        if not self.directory or not os.path.isdir(self.directory):
+            return {}
+        found = {}
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith('.json') and entry.is_file():
+                stat = entry.stat()
+                found[entry.name[:-5]] = (stat.st_mtime, stat.st_size)
+        return found
+
+    def _classifier(self, config):
+        # Tenants with the same keyword lists share one compiled matcher
+        signature = json.dumps([config.get('intent_keywords'), config.get('goodbye_phrases')], sort_keys=True)
+        if signature not in self._classifiers:
+            if not config.get('intent_keywords') and not config.get('goodbye_phrases'):
+                self._classifiers[signature] = self.default.classifier
+            else:
+                self._classifiers[signature] = CallClassifier(config.get('intent_keywords'),
+                                                              config.get('goodbye_phrases'))
+        return self._classifiers[signature]
+
+    def load(self):
+        """Load new or changed tenant files. Returns the number of tenants (re)built."""
+        with self._lock:
+            found = self._scan()
+            if found == self._mtimes:
+                return 0
+            by_key = {self.default.key: self.default}
+            rebuilt = 0
+            for key, signature in found.items():
+                current = self._by_key.get(key)
+                if current is not None and current is not self.default and self._mtimes.get(key) == signature:
+                    by_key[key] = current
+                    continue
+                try:
+                    with open(os.path.join(self.directory, key + '.json')) as f:
+                        config = json.load(f)
+                    tenant = Tenant(key, config, classifier=self._classifier(config))
+                    self._attach_services(tenant)
+                except Exception as e:
+                    print(f"Tenant config {key} not loaded: {e}")
+                    if current is not None and current is not self.default:
+                        by_key[key] = current  # Keep serving the last good version
+                    continue
+                by_key[key] = tenant
+                rebuilt += 1
+            by_number = {n: self.default for n in self.default.numbers}
+            for tenant in by_key.values():
+                for number in tenant.numbers:
+                    by_number[number] = tenant
+            # Swap whole maps so webhooks never see a half-loaded state
+            self._by_key, self._by_number, self._mtimes = by_key, by_number, found
+            self._close_unused_services()
+            self.reloads += 1
+        if rebuilt:
+            print(f"Loaded {rebuilt} tenant config(s); serving {len(by_key)} tenants")
+        return rebuilt
+
+    def _attach_services(self, tenant):
+        if not self.build_services:
+            return
+        key = tenant.services_key()
+        if key not in self._services:
+            self._services[key] = self.build_services(tenant)
+        tenant.services = self._services[key]
+
+    def _close_unused_services(self):
+        in_use = {id(t.services) for t in self._by_key.values()}
+        for key, services in list(self._services.items()):
+            if id(services) not in in_use:
+                del self._services[key]
+                try:
+                    services.close()
+                except Exception as e:
+                    print(f"Tenant services close error: {e}")
+
+    def start(self):
+        if self._thread or not self.directory:
+            return
+        self._thread = threading.Thread(target=self._watch, name="tenant-reload", daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        while True:
+            time.sleep(self.reload_seconds)
+            try:
+                self.load()
+            except Exception as e:
+                print(f"Tenant reload error: {e}")
+
+    def stats(self):
+        return {"tenants": len(self._by_key), "numbers": len(self._by_number), "reloads": self.reloads}
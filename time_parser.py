@@ -0,0 +1,220 @@
+import bisect
+import re
+from datetime import datetime, timedelta
+
+# ── Scheduling Time Parser ──
+# One precompiled pattern scans every caller utterance once and yields date
+# and time mentions. Each date is paired with the nearest time in its own
+# clause ("Tuesday at 2 or Wednesday at 3 pm" is two requests, not one), the
+# last request in an utterance stands for it ("Tuesday, no wait, Thursday"),
+# and utterances are scored by match confidence and how recently they were
+# said. The best one comes back with a confidence so booking can decide
+# whether to trust it.
+
+WEEKDAYS = {'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3, 'friday': 4, 'saturday': 5, 'sunday': 6}
+NUMBER_WORDS = {'one': 1, 'two': 2, 'three': 3, 'four': 4, 'five': 5, 'six': 6, 'seven': 7, 'eight': 8, 'nine': 9,
+                'ten': 10, 'eleven': 11, 'twelve': 12, 'a': 1, 'a couple of': 2, 'a couple': 2, 'couple of': 2,
+                'a few': 3, 'few': 3}
+MINUTE_WORDS = {'fifteen': 15, 'thirty': 30, 'forty five': 45, 'forty-five': 45, 'half past': 30}
+DAY_PARTS = {'morning': 10, 'noon': 12, 'midday': 12, 'lunch': 12, 'lunchtime': 12, 'afternoon': 14, 'evening': 16}
+AMPM_PARTS = ('morning', 'afternoon', 'evening')  # Parts of day that say AM or PM but not which hour
+
+_hour_words = '|'.join(w for w in NUMBER_WORDS if len(w) > 1 and ' ' not in w and w not in ('few',))
+_count_words = '|'.join(sorted((re.escape(w) for w in NUMBER_WORDS), key=len, reverse=True))
+_minute_words = '|'.join(re.escape(w) for w in MINUTE_WORDS if w != 'half past')
+_ampm = r"(?P<ampm>[ap]\.?\s?m\b\.?)"
+
+TOKEN_PATTERN = re.compile(r"""
+    \b(?:
+        (?P<reldate>day\ after\ tomorrow|today|tonight|tomorrow)
+      | (?P<offset>in\ (?P<count>\d+|""" + _count_words + r""")\ (?P<unit>days?|weeks?))
+      | (?:(?P<modifier>next|this|coming)\ )?(?P<weekday>monday|tuesday|wednesday|thursday|friday|saturday|sunday)s?
+      | (?P<nextweek>next\ week)
+      | (?P<clock>(?:(?:at|around|about|by)\ )?(?P<hour>\d{1,2})(?::(?P<minute>\d{2}))?\s*""" + _ampm + r""")
+      | (?P<at>(?:at|around|about|by)\ (?P<at_hour>\d{1,2})(?::(?P<at_minute>\d{2}))?\b(?:\ o'?clock)?)
+      | (?P<oclock>(?P<oc_hour>\d{1,2})\ o'?clock)
+      | (?P<bare>(?P<bare_hour>\d{1,2}):(?P<bare_minute>\d{2})\b)
+      | (?<=day\ )(?P<dayhour>\d{1,2})\b(?!\s*(?:st|nd|rd|th|:))
+      | (?P<wordtime>(?P<word_hour>""" + _hour_words + r""")(?:\ (?P<word_minute>""" + _minute_words + r"""))?
+            (?:\ ?(?P<word_ampm>[ap]\.?\s?m\b\.?)|\ o'?clock|(?=\ in\ the\ (?:morning|afternoon|evening))))
+      | (?:in\ the\ |this\ )?(?P<daypart>morning|afternoon|evening|noon|midday|lunchtime|lunch)
+    )
+""", re.IGNORECASE | re.VERBOSE)
+
+# Where one request ends and the next begins: punctuation, and the words callers use to correct or offer alternatives
+CLAUSE_BREAK = re.compile(r"[,;!?]|(?<![ap])(?<![ap]\.m)\.(?:\s|$)|\b(?:but|or|so|no wait|actually|instead)\b",
+                          re.IGNORECASE)
+
+
+class ParsedTime:
+    __slots__ = ('slot', 'confidence', 'text', 'utterance_index')
+
+    def __init__(self, slot, confidence, text, utterance_index):
+        self.slot = slot
+        self.confidence = confidence
+        self.text = text
+        self.utterance_index = utterance_index
+
+    def __repr__(self):
+        return f"ParsedTime({self.slot.isoformat()}, confidence={self.confidence:.2f}, text={self.text!r})"
+
+
+def _count(value):
+    return int(value) if value.isdigit() else NUMBER_WORDS[value.lower()]
+
+
+def _to_24h(hour, ampm, daypart=None):
+    if ampm:
+        pm = ampm.lower().startswith('p')
+        if pm and hour != 12:
+            return hour + 12
+        if not pm and hour == 12:
+            return 0
+        return hour
+    if daypart in ('afternoon', 'evening') and hour < 12:
+        return hour + 12
+    if daypart == 'morning':
+        return hour
+    # No AM/PM — assume PM for 1-6, AM for 7-11 (business-hours callers)
+    return hour + 12 if 1 <= hour <= 6 else hour
+
+
+def _date_mention(m, today):
+    """(date, confidence) for a date token, or None."""
+    if m.group('reldate'):
+        word = m.group('reldate').lower()
+        days = {'today': 0, 'tonight': 0, 'tomorrow': 1}.get(word, 2)
+        return today + timedelta(days=days), 0.5
+    if m.group('offset'):
+        days = _count(m.group('count')) * (7 if m.group('unit').lower().startswith('week') else 1)
+        return today + timedelta(days=days), 0.45
+    if m.group('weekday'):
+        weekday = WEEKDAYS[m.group('weekday').lower()]
+        days_ahead = (weekday - today.weekday()) % 7
+        modifier = (m.group('modifier') or '').lower()
+        if days_ahead == 0 and modifier != 'this':
+            days_ahead = 7  # Next week if today
+        if modifier == 'next' and today.weekday() + days_ahead <= 6:
+            days_ahead += 7  # "next Tuesday" said early in the week means the one after this week's
+        return today + timedelta(days=days_ahead), 0.5 if not modifier else 0.55
+    if m.group('nextweek'):
+        return today + timedelta(days=7 - today.weekday()), 0.3
+    return None
+
+
+def _time_mention(m):
+    """(hour, minute, confidence, daypart) for a time token, or None."""
+    if m.group('clock'):
+        hour, minute = int(m.group('hour')), int(m.group('minute') or 0)
+        if hour > 12 or minute > 59:
+            return None
+        return _to_24h(hour, m.group('ampm')), minute, 0.45, None
+    if m.group('at'):
+        hour, minute = int(m.group('at_hour')), int(m.group('at_minute') or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        return _to_24h(hour, None), minute, 0.3, None
+    if m.group('bare') or m.group('dayhour'):
+        hour = int(m.group('bare_hour') or m.group('dayhour'))
+        minute = int(m.group('bare_minute') or 0)
+        if not 1 <= hour <= 12 or minute > 59:
+            return None
+        return _to_24h(hour, None), minute, 0.3 if m.group('bare') else 0.25, None
+    if m.group('oclock'):
+        hour = int(m.group('oc_hour'))
+        if not 1 <= hour <= 12:
+            return None
+        return _to_24h(hour, None), 0, 0.3, None
+    if m.group('wordtime'):
+        hour = NUMBER_WORDS[m.group('word_hour').lower()]
+        minute = MINUTE_WORDS.get((m.group('word_minute') or '').lower(), 0)
+        ampm = m.group('word_ampm')
+        return _to_24h(hour, ampm), minute, 0.4 if ampm else 0.3, None
+    if m.group('daypart'):
+        part = m.group('daypart').lower()
+        hour = DAY_PARTS[part]
+        return hour, 0, 0.45 if hour == 12 else 0.2, part
+    return None
+
+
+def _clause_of(breaks, position):
+    return bisect.bisect_right(breaks, position)
+
+
+def _pair_times(dates, times, breaks):
+    """For each date, the times it may pair with: those in its own clause, plus any in a following clause that
+    has no date of its own ("in a couple of days, maybe at 2"). A time said before every date never carries
+    forward ("I work until 5 pm, so Thursday")."""
+    date_clauses = {_clause_of(breaks, d[0]) for d in dates}
+    paired = []
+    for i, (position, _, _) in enumerate(dates):
+        clause = _clause_of(breaks, position)
+        next_position = dates[i + 1][0] if i + 1 < len(dates) else float('inf')
+        own = [t for t in times if _clause_of(breaks, t[0]) == clause]
+        orphans = [t for t in times if position < t[0] < next_position
+                   and _clause_of(breaks, t[0]) not in date_clauses]
+        paired.append(own or orphans)
+    return paired
+
+
+def parse_time(utterances, tz, now=None, recency_decay=0.85):
+    """Best (date, time) the caller asked for across the whole transcript, or None."""
+    now = now or datetime.now(tz)
+    today = now.date()
+    total = len(utterances)
+    candidates = []
+    last_date = None  # carries "Tuesday" forward to "around 2 then" in a later turn
+    for index, utterance in enumerate(utterances):
+        dates, times = [], []
+        for m in TOKEN_PATTERN.finditer(utterance):
+            date = _date_mention(m, today)
+            if date:
+                dates.append((m.start(), date, m.group(0)))
+                if m.group('reldate') and m.group('reldate').lower() == 'tonight':
+                    # An evening part of day: makes "at 7" PM, and means 6 PM — too vague to book — on its own
+                    times.append((m.start(), (18, 0, 0.1, 'evening'), ''))
+                continue
+            time_of_day = _time_mention(m)
+            if time_of_day:
+                times.append((m.start(), time_of_day, m.group(0)))
+        # A part of day like "this afternoon" with no date means today
+        if not dates and not last_date and any(t[1][3] for t in times):
+            if 'this' in utterance.lower() or 'today' in utterance.lower():
+                dates.append((times[0][0], (today, 0.4), ''))
+        pairs = []
+        if dates:
+            breaks = [m.start() for m in CLAUSE_BREAK.finditer(utterance)]
+            for (position, (date, date_conf), text), nearby in zip(dates, _pair_times(dates, times, breaks)):
+                pairs.append((date, date_conf, position, text, nearby))
+            last_date = pairs[-1][:2]
+        elif times and last_date:
+            pairs.append((last_date[0], last_date[1] * 0.8, times[0][0], '', times))
+        weight = recency_decay ** (total - 1 - index)
+        best = None
+        for date, date_conf, position, text, nearby in pairs:
+            hour, minute, time_conf, label = 10, 0, 0.0, ''  # Default to 10 AM when no time was given
+            if nearby:
+                # The time said closest to this date, the more specific one if two are equally close. A part of
+                # day ("tonight", "afternoon") only stands in for a time when no hour was said with it.
+                hours = [t for t in nearby if t[1][3] not in AMPM_PARTS] or nearby
+                nearest = min(hours, key=lambda t: (abs(t[0] - position), -t[1][2]))
+                (hour, minute, time_conf, part), label = nearest[1], nearest[2]
+                # "2 in the afternoon" — let a day part fix an AM/PM-less hour
+                parts = [t for t in nearby if t[1][3] and t is not nearest]
+                if parts and not part and hour < 12 and time_conf < 0.45:
+                    hour = _to_24h(hour if hour <= 12 else hour - 12, None, parts[0][1][3])
+                    time_conf += 0.1
+            confidence = min(1.0, date_conf + time_conf)
+            try:
+                slot = tz.localize(datetime(date.year, date.month, date.day, hour, minute))
+            except ValueError:
+                continue
+            # Within one utterance the last request stands, as long as it came with a time when an earlier one did
+            if best is None or nearby or not best[5]:
+                best = (confidence * weight, confidence, slot, (text + ' ' + label).strip(), index, bool(nearby))
+        if best:
+            candidates.append(best[:5])
+    if not candidates:
+        return None
+    _, confidence, slot, text, index = max(candidates, key=lambda c: (c[0], c[4]))
+    return ParsedTime(slot, round(confidence, 2), text, index)